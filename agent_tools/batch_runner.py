@@ -0,0 +1,105 @@
+"""
+OpenAI Batch API runner for non-latency-critical manipulation passes.
+
+Offline dataset generation does not need synchronous latency: the Batch
+API charges 50% of standard pricing and runs on separate capacity, so a
+large robustness pass neither costs full price nor consumes the account's
+synchronous RPM budget. BatchBuilder records would-be call_agent requests,
+uploads them as one JSONL batch job, polls until completion, and indexes
+the responses by custom_id.
+"""
+
+import json
+import tempfile
+import time
+
+from agent_tools.utils import client_openai, _TEMPERATURE_IGNORING_MODELS
+
+
+class BatchBuilder:
+    """
+    Collects deferred chat requests and executes them as one Batch API job.
+
+    Usage:
+        builder = BatchBuilder(model="gpt-4o")
+        for item in items:
+            builder.add(custom_id=item["id"], user_msg=..., system_msg=...)
+        results = builder.flush()          # {custom_id: response_text}
+    """
+
+    def __init__(self, model: str = "gpt-4o", temperature: float = 0,
+                 completion_window: str = "24h", poll_interval: int = 60):
+        self.model = model
+        self.temperature = temperature
+        self.completion_window = completion_window
+        self.poll_interval = poll_interval
+        self._requests = []
+
+    def add(self, custom_id: str, user_msg: str, system_msg: str,
+            model: str = None, temperature: float = None,
+            response_format: dict = None) -> str:
+        """Queues one request; returns its custom_id for later lookup."""
+        body = {
+            "model": model or self.model,
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_msg},
+            ],
+        }
+        # Reasoning models reject the temperature parameter outright.
+        if body["model"] not in _TEMPERATURE_IGNORING_MODELS:
+            body["temperature"] = self.temperature if temperature is None else temperature
+        if response_format is not None:
+            body["response_format"] = response_format
+        self._requests.append({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body,
+        })
+        return custom_id
+
+    def __len__(self):
+        return len(self._requests)
+
+    def flush(self) -> dict:
+        """
+        Uploads the queued requests, waits for the batch to finish and
+        returns {custom_id: response_text}. Raises RuntimeError when the
+        batch ends in a non-completed state.
+        """
+        if not self._requests:
+            return {}
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            for request in self._requests:
+                f.write(json.dumps(request) + "\n")
+            input_path = f.name
+
+        with open(input_path, "rb") as f:
+            input_file = client_openai.files.create(file=f, purpose="batch")
+
+        batch = client_openai.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(self.poll_interval)
+            batch = client_openai.batches.retrieve(batch.id)
+
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+        output = client_openai.files.content(batch.output_file_id)
+        results = {}
+        for line in output.text.splitlines():
+            record = json.loads(line)
+            body = record.get("response", {}).get("body", {})
+            choices = body.get("choices") or []
+            if choices:
+                results[record["custom_id"]] = choices[0]["message"]["content"]
+
+        self._requests = []
+        return results
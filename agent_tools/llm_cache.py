@@ -0,0 +1,130 @@
+"""
+Exact-match on-disk response cache for deterministic LLM calls.
+
+Repeated runs during development and ablations re-submit identical prompts
+to the provider — pure waste when temperature is 0 (or the model ignores
+temperature entirely). call_agent consults this cache before dispatching;
+hits skip the network round-trip and its cost. An in-memory lru_cache in
+utils sits in front of this for within-run repeats.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+class LLMCache:
+    """
+    SHA256-keyed diskcache wrapper with a TTL. Thread- and process-safe
+    (diskcache uses SQLite underneath) with LRU eviction at size_limit.
+    """
+
+    def __init__(self, cache_dir: str = "~/.cache/das_red_team",
+                 ttl: int = 7 * 86400, size_limit: int = 2**30):
+        import diskcache
+        self._cache = diskcache.Cache(os.path.expanduser(cache_dir), size_limit=size_limit)
+        self._ttl = ttl
+
+    @staticmethod
+    def make_key(agent_name: str, system_msg: str, user_msg: str,
+                 image_url=None, response_format=None, max_output_tokens=None,
+                 n: int = 1) -> str:
+        """
+        Stable digest over everything that determines a deterministic
+        response. Temperature is deliberately absent: only calls the caller
+        already knows are deterministic should reach the cache. `n` keys
+        multi-sample calls separately from single completions, since their
+        cached value is a list rather than one string.
+        """
+        payload = json.dumps({
+            "m": agent_name,
+            "s": system_msg,
+            "u": user_msg,
+            "i": image_url,
+            "f": response_format,
+            "o": max_output_tokens,
+            "n": n,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str):
+        return self._cache.get(key)
+
+    def set(self, key: str, response: str) -> None:
+        self._cache.set(key, response, expire=self._ttl)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._cache
+
+
+class SemanticLLMCache:
+    """
+    Embedding-based cache layered on top of the exact-match cache: a prompt
+    cosine-similar to an already-answered one returns the stored response,
+    so paraphrased manipulation variants cost one embedding lookup instead
+    of a completion. Entries are scoped per (model, system prompt) so hits
+    never cross tasks. Uses a FAISS inner-product index when faiss is
+    installed, otherwise a NumPy dot product over the stored matrix (fine
+    at the few-thousand-entry scale of a red-team run).
+
+    Only deterministic (temperature == 0) calls should go through this, and
+    callers opt in per call — see the semantic_cache kwarg on call_agent.
+    """
+
+    def __init__(self, threshold: float = 0.93, embed_model: str = "text-embedding-3-small"):
+        self._threshold = threshold
+        self._embed_model = embed_model
+        self._scopes = {}  # scope -> {"vectors": [np.ndarray], "responses": [str], "faiss": index|None}
+        self._embed_memo = {}  # text digest -> normalized vector (avoids re-embedding on miss+add)
+
+    def _embed(self, text: str) -> np.ndarray:
+        digest = hashlib.sha1(text.encode()).hexdigest()
+        vector = self._embed_memo.get(digest)
+        if vector is None:
+            from agent_tools.utils import client_openai
+            raw = client_openai.embeddings.create(model=self._embed_model, input=text).data[0].embedding
+            vector = np.asarray(raw, dtype="float32")
+            vector /= np.linalg.norm(vector)
+            self._embed_memo[digest] = vector
+        return vector
+
+    def _get_scope(self, scope: str):
+        state = self._scopes.get(scope)
+        if state is None:
+            state = {"vectors": [], "responses": [], "faiss": None}
+            self._scopes[scope] = state
+        return state
+
+    def get(self, scope: str, user_msg: str):
+        """Returns the cached response for the nearest stored prompt above
+        the similarity threshold, or None."""
+        state = self._get_scope(scope)
+        if not state["responses"]:
+            return None
+        query = self._embed(user_msg)
+        if state["faiss"] is not None:
+            scores, indices = state["faiss"].search(query[None, :], 1)
+            score, best = float(scores[0][0]), int(indices[0][0])
+        else:
+            scores = np.stack(state["vectors"]) @ query
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+        if score > self._threshold:
+            return state["responses"][best]
+        return None
+
+    def add(self, scope: str, user_msg: str, response: str) -> None:
+        state = self._get_scope(scope)
+        vector = self._embed(user_msg)
+        if not state["responses"]:
+            try:
+                import faiss
+                state["faiss"] = faiss.IndexFlatIP(vector.shape[0])
+            except ImportError:
+                state["faiss"] = None
+        state["vectors"].append(vector)
+        state["responses"].append(response)
+        if state["faiss"] is not None:
+            state["faiss"].add(vector[None, :])
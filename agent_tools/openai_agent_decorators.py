@@ -13,6 +13,7 @@ from agent_tools.cog_bias_manipulation import introduce_bias
 from typing import Optional, Literal, List
 from pydantic import BaseModel
 import asyncio
+import orjson
 from utils_general import create_medqa_question_dict
 
 # TOOLS = ['introduce_cognitive_bias_tool']
@@ -230,8 +231,12 @@ async def generate_distractor_options_tool(question_data: QuestionData, addition
     # remove all None valued options
     question_data["options"] = {k: v for k, v in question_data["options"].items() if v is not None}
 
+    # clamp to the free option letters left in Options (A..J), otherwise extras would be silently dropped
+    max_free_option_letters = len(Options.model_fields) - len(question_data["options"])
+    additional_choices_num = min(additional_choices_num, max_free_option_letters)
+
     # call generate_distractor_options
-    question_data = generate_distractor_options(question_data, additional_choices_num=4, model="gpt-4o", temperature=0, api='client')
+    question_data = generate_distractor_options(question_data, additional_choices_num=additional_choices_num, model="gpt-4o", temperature=0, api='client')
 
     # convert question_data to QuestionData
     question_data = QuestionData(**question_data)
@@ -373,7 +378,7 @@ async def main():
 
         user_message = (
                     f"Round 1. Current question JSON:\n"
-                    f"{question_data.model_dump_json(indent=2)}\n\n"
+                    f"{orjson.dumps(question_data.model_dump()).decode()}\n\n"
                     f"In last round, the target model answered correctly.  Choose and carry out the next manipulation to make the model answer incorrectly."
                     )
         input_items: list[TResponseInputItem] = [{"role": "user", "content": user_message}]
@@ -0,0 +1,144 @@
+"""
+Rate-limit-aware parallel request processor for call_agent.
+
+A plain ThreadPoolExecutor scale-up has no RPM/TPM accounting and runs
+straight into 429s. This module ports the leaky-bucket pattern from the
+OpenAI cookbook's api_request_parallel_processor: two capacity counters
+(requests/min and tokens/min) refill continuously, a request is only
+dispatched when both buckets have room, and rate-limit errors are retried
+with exponential backoff plus jitter. Completed results can be appended to
+a jsonl sidecar so a crashed run resumes without re-paying finished calls.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+
+from agent_tools.utils import call_agent_async, estimate_tokens
+
+
+class ParallelLLMRunner:
+    """
+    Drives many call_agent_async invocations concurrently while staying
+    under the provider's requests-per-minute and tokens-per-minute
+    ceilings.
+
+    Usage:
+        runner = ParallelLLMRunner(max_requests_per_minute=500,
+                                   max_tokens_per_minute=90_000)
+        results = runner.run(list_of_call_agent_kwargs)
+    """
+
+    def __init__(
+        self,
+        max_requests_per_minute: int = 500,
+        max_tokens_per_minute: int = 90_000,
+        max_attempts: int = 5,
+        results_path: str = None,
+    ):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.max_attempts = max_attempts
+        self.results_path = results_path
+
+        self._available_request_capacity = float(max_requests_per_minute)
+        self._available_token_capacity = float(max_tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._capacity_lock = None  # created lazily on the running loop
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._available_request_capacity = min(
+            self._available_request_capacity + self.max_requests_per_minute * elapsed / 60.0,
+            float(self.max_requests_per_minute),
+        )
+        self._available_token_capacity = min(
+            self._available_token_capacity + self.max_tokens_per_minute * elapsed / 60.0,
+            float(self.max_tokens_per_minute),
+        )
+
+    async def _acquire(self, est_tokens: int):
+        """Blocks until both buckets can cover one request of est_tokens."""
+        while True:
+            async with self._capacity_lock:
+                self._refill()
+                if (self._available_request_capacity >= 1
+                        and self._available_token_capacity >= est_tokens):
+                    self._available_request_capacity -= 1
+                    self._available_token_capacity -= est_tokens
+                    return
+            await asyncio.sleep(0.001)
+
+    def _is_rate_limit_error(self, error: Exception) -> bool:
+        # Checked by name so a provider SDK that is not installed (or not
+        # used in this run) does not have to be imported here.
+        return type(error).__name__ == "RateLimitError"
+
+    async def _submit(self, index: int, call_kwargs: dict):
+        est_tokens = estimate_tokens(
+            call_kwargs.get("system_msg", "") + call_kwargs.get("user_msg", ""),
+            call_kwargs.get("agent_name", "gpt-4o"),
+        )
+        for attempt in range(self.max_attempts):
+            await self._acquire(est_tokens)
+            try:
+                response = await call_agent_async(**call_kwargs)
+            except Exception as error:
+                if self._is_rate_limit_error(error) and attempt < self.max_attempts - 1:
+                    # Rate-limited: the minute's budget is gone, back off.
+                    async with self._capacity_lock:
+                        self._available_request_capacity = 0.0
+                        self._available_token_capacity = 0.0
+                    await asyncio.sleep(2 ** attempt + random.random())
+                    continue
+                raise
+            self._persist(index, call_kwargs, response)
+            return response
+
+    def _persist(self, index: int, call_kwargs: dict, response: str):
+        if self.results_path is None:
+            return
+        with open(self.results_path, "a") as f:
+            f.write(json.dumps({
+                "index": index,
+                "agent_name": call_kwargs.get("agent_name"),
+                "user_msg": call_kwargs.get("user_msg"),
+                "response": response,
+            }) + "\n")
+
+    def _load_completed(self):
+        """Indices already present in the sidecar from a previous run."""
+        completed = {}
+        if self.results_path and os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        completed[record["index"]] = record["response"]
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+        return completed
+
+    async def run_async(self, calls):
+        """
+        `calls` is a sequence of kwargs dicts for call_agent_async. Returns
+        the responses in input order; calls already present in the results
+        sidecar are served from it instead of re-dispatched.
+        """
+        self._capacity_lock = asyncio.Lock()
+        completed = self._load_completed()
+
+        async def _one(index, call_kwargs):
+            if index in completed:
+                return completed[index]
+            return await self._submit(index, call_kwargs)
+
+        return await asyncio.gather(*[_one(i, c) for i, c in enumerate(calls)])
+
+    def run(self, calls):
+        """Sync wrapper around run_async."""
+        return asyncio.run(self.run_async(calls))
@@ -3,7 +3,137 @@ import json
 import random
 import re
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from agent_tools.utils import call_openai_agent, call_agent
+from agent_tools.utils import call_openai_agent, call_agent, call_agent_async
+
+# Example distraction sentences to guide GPT’s style:
+_EXAMPLE_DISTRACTIONS = [
+    "The patient joked that their favorite mystery novel has a plot as twisted as a single-stranded DNA.",
+    "The patient's zodiac sign is Cancer.",
+    "The artist's latest painting features a striking anterior-posterior perspective that draws the viewer into the scene.",
+    "The patient's aunt mentioned that her friend's parrot has been unusually quiet and perching more often than usual.",
+    "The patient's dog has diabetes and cannot see properly.",
+    "The patient's niece mentioned that her classmate's father was diagnosed with a staph infection last month."
+]
+
+# Rendered once at import: every question reuses the same ~500-byte block
+# instead of re-joining it per call.
+_EXAMPLE_DISTRACTIONS_STR = "\n".join(f"- {ex}" for ex in _EXAMPLE_DISTRACTIONS)
+
+# SYSTEM (or developer) instructions: keep GPT on task
+_DISTRACTION_SYSTEM_INSTRUCTIONS = (
+    "You are a helpful assistant focusing on medical education. "
+    "You will receive a question, the correct answer, and a set of distractors. "
+    "Your goal is to generate ONE short, casual or tangential sentence that references "
+    "the chosen distractor concept to distract the reader. "
+    "Do not reveal which is the correct or incorrect choice. "
+    "Use a casual or anecdotal style, referencing the distractor in some everyday scenario. "
+    "The distraction statement should remain tangential and must NOT directly involve the patients themselves, as this could interfere with the medical diagnostic reasoning process."
+    "Return only the single distraction sentence."
+)
+
+
+def _pick_distractor(question_data):
+    """Randomly picks one wrong choice to reference in the distraction sentence."""
+    options = question_data["options"]
+    correct_idx = question_data["answer_idx"]
+
+    # Fail fast on malformed input: a missing correct index would otherwise
+    # silently allow the correct answer itself to be picked as "distractor".
+    if correct_idx not in options:
+        raise KeyError(f"answer_idx '{correct_idx}' not found in options {list(options)}")
+
+    # Only one wrong choice is sampled, so a key list is enough — no dict
+    # copy of the wrong choices.
+    wrong_labels = [k for k in options if k != correct_idx]
+    distractor_label = wrong_labels[random.randrange(len(wrong_labels))]
+    distractor_text = options[distractor_label]
+    print(f"[INFO] Chosen distractor item: {distractor_label}: {distractor_text}")
+    return distractor_label, distractor_text
+
+
+def _build_distraction_user_prompt(question_data):
+    """
+    Picks a random wrong choice and builds the user prompt asking for one
+    distraction sentence referencing it.
+    """
+    question_stem = question_data["question"]
+    correct_answer = question_data["answer"]
+
+    distractor_label, distractor_text = _pick_distractor(question_data)
+
+    # USER prompt: Provide context and request
+    return _USER_TEMPLATE.format(
+        ex=_EXAMPLE_DISTRACTIONS_STR,
+        stem=question_stem,
+        ans=correct_answer,
+        dist=distractor_text,
+    )
+
+
+# One span per sentence: text up to (and including) its terminal
+# punctuation run, or a trailing fragment with no terminal punctuation.
+# A str.translate + split("\x00") scan was benchmarked as an alternative
+# but loses to this pattern once punctuation runs ("...", "!?") need a
+# merge pass to stay one sentence, so finditer stays.
+_SENT_RE = re.compile(r'[^.?!]+[.?!]*')
+
+
+def _split_stem(question_stem: str):
+    """
+    Splits the stem into sentences with a single finditer pass instead of
+    re.split + a text/punct pairing loop: each match is already one full
+    sentence, so no intermediate token list or re-concatenation churn.
+    """
+    return [
+        stripped for m in _SENT_RE.finditer(question_stem.strip())
+        if (stripped := m.group(0).strip())
+    ]
+
+
+def _insert_into_sentences(sentence_list, question_stem: str, distraction_sentence: str) -> str:
+    """
+    Inserts the distraction sentence right before the final question
+    sentence of the stem (the last sentence ending with '?').
+    """
+
+    if len(sentence_list) < 2:
+        # If there's only 1 sentence, just prepend the distraction (fallback).
+        return distraction_sentence + " " + question_stem
+
+    # Typically, the last sentence ends with '?'. We want to insert
+    # the distraction right before that last question sentence; when no
+    # sentence ends with '?', it goes before the last sentence instead.
+    final_q_idx = None
+    for i, sentence in enumerate(sentence_list):
+        if sentence.endswith('?'):
+            final_q_idx = i
+    if final_q_idx is None:
+        final_q_idx = len(sentence_list) - 1
+
+    # Slice-and-join instead of list.insert: no O(N) memmove, and the
+    # (possibly memoized) input list is left untouched.
+    return " ".join(
+        sentence_list[:final_q_idx] + [distraction_sentence] + sentence_list[final_q_idx:]
+    )
+
+
+def _sentences(question_data):
+    """
+    Sentence split memoized on the question dict itself, so chained
+    manipulations over the same stem split it once. Any code that mutates
+    question_data["question"] must drop the slot with
+    question_data.pop("_sentences", None).
+    """
+    sentences = question_data.get("_sentences")
+    if sentences is None:
+        sentences = _split_stem(question_data["question"])
+        question_data["_sentences"] = sentences
+    return sentences
+
+
+def _insert_distraction(question_stem: str, distraction_sentence: str) -> str:
+    return _insert_into_sentences(_split_stem(question_stem), question_stem, distraction_sentence)
+
 
 def add_distraction_sentence(question_data, model="gpt-4o", temperature=0, api='agent'):
     """
@@ -30,56 +160,15 @@ def add_distraction_sentence(question_data, model="gpt-4o", temperature=0, api='
         dict: Updated question_data with a new "question" field containing the
               distraction sentence inserted before the final question text.
     """
+    stem = question_data["question"].strip()
+    if not stem or len(stem) < 10:
+        # Nothing to distract into; also keeps empty/garbage stems out of
+        # provider prompts (and their logs).
+        return question_data
 
-    question_stem = question_data["question"]
-    correct_answer = question_data["answer"]
-    options = question_data["options"]
-    correct_idx = question_data["answer_idx"]
-
-    # Identify wrong choices by filtering out the correct index
-    wrong_choices = {
-        k: v for k, v in options.items() if k != correct_idx
-    }
-
-    # Randomly pick one wrong choice to reference in the distraction sentence
-    distractor_label, distractor_text = random.choice(list(wrong_choices.items()))
-    print(f"[INFO] Chosen distractor item: {distractor_label}: {distractor_text}")
-
-    # Provide some example distraction sentences to guide GPT’s style:
-    example_distractions = [
-        "The patient joked that their favorite mystery novel has a plot as twisted as a single-stranded DNA.",
-        "The patient's zodiac sign is Cancer.",
-        "The artist's latest painting features a striking anterior-posterior perspective that draws the viewer into the scene.",
-        "The patient's aunt mentioned that her friend's parrot has been unusually quiet and perching more often than usual.",
-        "The patient's dog has diabetes and cannot see properly.",
-        "The patient's niece mentioned that her classmate's father was diagnosed with a staph infection last month."
-    ]
-    examples_str = "\n".join(f"- {ex}" for ex in example_distractions)
-
-    # SYSTEM (or developer) instructions: keep GPT on task
-    system_instructions = (
-        "You are a helpful assistant focusing on medical education. "
-        "You will receive a question, the correct answer, and a set of distractors. "
-        "Your goal is to generate ONE short, casual or tangential sentence that references "
-        "the chosen distractor concept to distract the reader. "
-        "Do not reveal which is the correct or incorrect choice. "
-        "Use a casual or anecdotal style, referencing the distractor in some everyday scenario. "
-        "The distraction statement should remain tangential and must NOT directly involve the patients themselves, as this could interfere with the medical diagnostic reasoning process."
-        "Return only the single distraction sentence."
-    )
+    sentence_list = _sentences(question_data)
+    user_prompt = _build_distraction_user_prompt(question_data)
 
-    # USER prompt: Provide context and request
-    user_prompt = (
-        f"Here are some example distraction sentences:\n\n"
-        f"{examples_str}\n\n"
-        f"---\n\n"
-        f"The question is:\n{question_stem}\n\n"
-        f"Correct answer is: {correct_answer}\n"
-        f"The chosen distractor to reference is: '{distractor_text}'\n\n"
-        "Please produce ONE short distraction sentence referencing the distractor. "
-        "Make it casual, tangential, or anecdotal, but do NOT mention the correct choice.\n"
-        "Return ONLY the sentence. Do not include quotes or markdown."
-    )
     if api == 'client':
         # distraction_sentence = client.responses.create(
         #     model=model,
@@ -90,7 +179,7 @@ def add_distraction_sentence(question_data, model="gpt-4o", temperature=0, api='
         distraction_sentence = call_agent(
             agent_name=model,
             user_msg=user_prompt,
-            system_msg=system_instructions,
+            system_msg=_DISTRACTION_SYSTEM_INSTRUCTIONS,
             temperature=temperature
         )
     elif api == 'agent':
@@ -98,60 +187,144 @@ def add_distraction_sentence(question_data, model="gpt-4o", temperature=0, api='
             agent_title="Distractor Choice Generator",
             model=model,
             user_msg=user_prompt,
-            system_msg=system_instructions
+            system_msg=_DISTRACTION_SYSTEM_INSTRUCTIONS
         )
     else:
         raise ValueError("Invalid API type. Use 'client' or 'agent'.")
 
-    tokens = re.split(r'([.?!]+)', question_stem.strip())
-
-    def rebuild_sentences(token_list):
-        """
-        Re-combine text + punctuation tokens into a list of full sentences.
-        """
-        sentences = []
-        # We'll step by 2: token_list[i] is text, token_list[i+1] is punctuation (if any).
-        i = 0
-        while i < len(token_list):
-            text_part = token_list[i].strip()
-            punct_part = ""
-            if i + 1 < len(token_list):
-                punct_part = token_list[i + 1]
-            i += 2
-
-            # Combine them
-            combined = (text_part + punct_part).strip()
-            # Skip empty tokens
-            if combined:
-                sentences.append(combined)
-        return sentences
-
-    sentence_list = rebuild_sentences(tokens)
+    # Update the question data
+    question_data["question"] = _insert_into_sentences(
+        sentence_list, question_data["question"], distraction_sentence
+    )
+    # The stem changed, so the memoized split is stale.
+    question_data.pop("_sentences", None)
+
+    return question_data
 
-    if len(sentence_list) < 2:
-        # If there's only 1 sentence, just prepend the distraction (fallback).
-        updated_question = distraction_sentence + " " + question_stem
-    else:
-        # Typically, the last sentence ends with '?'. We want to insert
-        # the distraction right before that last question sentence.
-        # For reliability, let's find the index of the final question sentence
-        # that ends with '?'.
-        question_indices = [i for i, s in enumerate(sentence_list) if s.endswith('?')]
-        if question_indices:
-            # The final question index is:
-            final_q_idx = question_indices[-1]
-            # Insert the distraction sentence right before that final question sentence
-            sentence_list.insert(final_q_idx, distraction_sentence)
-        else:
-            # If for some reason no sentence ends with '?',
-            # just insert the distraction sentence before the last sentence.
-            sentence_list.insert(len(sentence_list) - 1, distraction_sentence)
-
-        # Rebuild into one string
-        updated_question = " ".join(sentence_list)
 
-    # Update the question data
-    question_data["question"] = updated_question
+# Static user-prompt skeleton, formatted per call with the variable parts.
+_USER_TEMPLATE = (
+    "Here are some example distraction sentences:\n\n"
+    "{ex}\n\n"
+    "---\n\n"
+    "The question is:\n{stem}\n\n"
+    "Correct answer is: {ans}\n"
+    "The chosen distractor to reference is: '{dist}'\n\n"
+    "Please produce ONE short distraction sentence referencing the distractor. "
+    "Make it casual, tangential, or anecdotal, but do NOT mention the correct choice.\n"
+    "Return ONLY the sentence. Do not include quotes or markdown."
+)
+
+_BATCH_LINE_RE = re.compile(r'^\s*\[?\d+\]?\.?\s*(.+)$')
+
+
+def add_distraction_sentences_batch(question_data_list, model="gpt-4o", temperature=0, batch_size=8, api='client'):
+    """
+    Batched variant of add_distraction_sentence: marshals up to batch_size
+    questions into one prompt that returns a JSON array of distraction
+    sentences, so the static instructions and examples are billed once per
+    batch and one round-trip replaces batch_size of them.
+
+    Args:
+        question_data_list (list): question_data dicts as in add_distraction_sentence.
+        model (str): The LLM model to use.
+        temperature (float): Model temperature.
+        batch_size (int): Questions marshaled per API call. Keep small
+            (4-16); very large batches trade the saved round-trips back as
+            per-call latency growth.
+        api (str): Kept for signature parity with add_distraction_sentence;
+            the batch path always uses the client API.
+
+    Returns:
+        list: The question_data dicts, each with the distraction inserted.
+    """
+    for start in range(0, len(question_data_list), batch_size):
+        chunk = question_data_list[start:start + batch_size]
+
+        item_blocks = []
+        for i, question_data in enumerate(chunk, 1):
+            _, distractor_text = _pick_distractor(question_data)
+            item_blocks.append(
+                f"[{i}]\n"
+                f"Question:\n{question_data['question']}\n"
+                f"Correct answer is: {question_data['answer']}\n"
+                f"The chosen distractor to reference is: '{distractor_text}'"
+            )
+
+        user_prompt = (
+            f"Here are some example distraction sentences:\n\n"
+            f"{_EXAMPLE_DISTRACTIONS_STR}\n\n"
+            f"---\n\n"
+            f"Below are {len(chunk)} independent questions, numbered [1] to [{len(chunk)}].\n\n"
+            + "\n\n".join(item_blocks) + "\n\n"
+            "For EACH question, produce ONE short distraction sentence referencing its chosen distractor. "
+            "Make each casual, tangential, or anecdotal, but do NOT mention the correct choice.\n"
+            f"Return a JSON array of {len(chunk)} strings, one distraction sentence per item, preserving order. "
+            "Do not include markdown or any other text."
+        )
+
+        response = call_agent(
+            agent_name=model,
+            user_msg=user_prompt,
+            system_msg=_DISTRACTION_SYSTEM_INSTRUCTIONS,
+            temperature=temperature
+        )
+
+        try:
+            sentences = json.loads(re.sub(r"^```[\w]*|```$", "", response.strip()).strip())
+            if not isinstance(sentences, list):
+                raise ValueError("expected a JSON array")
+        except (json.JSONDecodeError, ValueError):
+            # Fallback: one numbered (or plain) sentence per line.
+            sentences = [
+                m.group(1).strip().strip('"')
+                for m in (_BATCH_LINE_RE.match(line) for line in response.splitlines())
+                if m and m.group(1).strip()
+            ]
+
+        for i, question_data in enumerate(chunk):
+            sentence = sentences[i].strip() if i < len(sentences) and sentences[i] else ""
+            if not sentence:
+                # Fall back to a per-item call for items the batch response
+                # missed, instead of silently leaving them unmanipulated.
+                print(f"Warning: batch response missed item [{i + 1}] "
+                      f"(question {start + i + 1}); retrying individually.")
+                add_distraction_sentence(
+                    question_data, model=model, temperature=temperature, api='client'
+                )
+                continue
+            question_data["question"] = _insert_into_sentences(
+                _sentences(question_data), question_data["question"], sentence
+            )
+            question_data.pop("_sentences", None)
+
+    return question_data_list
+
+
+async def add_distraction_sentence_async(question_data, model="gpt-4o", temperature=0):
+    """
+    Async variant of add_distraction_sentence, so a batch of questions can
+    be manipulated concurrently (see robustness_utils.run_manipulation_batch)
+    instead of paying one network round-trip at a time.
+    """
+    stem = question_data["question"].strip()
+    if not stem or len(stem) < 10:
+        return question_data
+
+    sentence_list = _sentences(question_data)
+    user_prompt = _build_distraction_user_prompt(question_data)
+
+    distraction_sentence = await call_agent_async(
+        agent_name=model,
+        user_msg=user_prompt,
+        system_msg=_DISTRACTION_SYSTEM_INSTRUCTIONS,
+        temperature=temperature
+    )
+
+    question_data["question"] = _insert_into_sentences(
+        sentence_list, question_data["question"], distraction_sentence
+    )
+    question_data.pop("_sentences", None)
 
     return question_data
 
@@ -185,4 +358,3 @@ if __name__ == "__main__":
     print("\n===== OPTIONS =====")
     for k, v in updated_data["options"].items():
         print(f"{k}. {v}")
-    print("\nCorrect Answer Index:", updated_data["answer_idx"])
\ No newline at end of file
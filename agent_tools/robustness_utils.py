@@ -1,9 +1,38 @@
-from agent_tools.question_distraction import add_distraction_sentence
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from agent_tools.question_distraction import (
+    add_distraction_sentence,
+    add_distraction_sentence_async,
+    add_distraction_sentences_batch,
+)
 from agent_tools.cog_bias_manipulation import introduce_bias
 from agent_tools.distractor_introduction import generate_distractor_options
 from agent_tools.measurement_adjust import adjust_impossible_measurement
 from agent_tools.invert_question import invert_final_question_and_answer
 
+def _next_label(labels) -> str:
+    """
+    Returns the option label after the highest one in `labels`, using
+    Excel-style base-26 letters ("A".."Z", "AA", "AB", ...). A single
+    max() scan replaces sorting, and the carry past "Z" is handled
+    correctly instead of chr(ord("Z") + 1) producing "[".
+    """
+    def _label_value(label):
+        value = 0
+        for char in label:
+            value = value * 26 + (ord(char) - 64)
+        return value
+
+    highest = max((_label_value(label) for label in labels), default=0)
+    n = highest + 1
+    out = ""
+    while n:
+        n, remainder = divmod(n - 1, 26)
+        out = chr(65 + remainder) + out
+    return out
+
+
 def add_none_of_the_options_are_correct(question_data: dict) -> dict:
     """
     Appends a new option labeled with the next letter in sequence.
@@ -23,24 +52,12 @@ def add_none_of_the_options_are_correct(question_data: dict) -> dict:
         dict: The same question_data but with an additional option.
     """
 
-    # Copy the original options
-    updated_options = dict(question_data.get("options", {}))
-
-    # Sort the existing labels (e.g., ["A", "B", "C", ...])
-    existing_labels = sorted(updated_options.keys())
-    if not existing_labels:
-        # If no options exist, we start with "A"
-        next_label = "A"
-    else:
-        # Otherwise, find the highest letter and move to the next
-        last_label = existing_labels[-1]
-        next_label = chr(ord(last_label) + 1)
-
-    # Insert the new choice
-    updated_options[next_label] = "None of the options are correct"
+    # The caller owns question_data, so mutate the options dict in place
+    # instead of copying it.
+    options = question_data.setdefault("options", {})
 
-    # Update the question data
-    question_data["options"] = updated_options
+    # Insert the new choice under the next free label ("A" when empty).
+    options[_next_label(options.keys())] = "None of the options are correct"
 
     return question_data
 
@@ -65,6 +82,11 @@ def replace_correct_answer_to_none_of_the_options_are_correct(question_data):
     return question_data
 
 def question_manipulation(question_data, manipulation, model, temperature, n_bias_styles: int = 1, additional_choices_num: int = 4,  api: str = "client"):
+    # Convention for chained manipulations: the sentence split of the stem
+    # may be memoized on question_data["_sentences"] (see
+    # question_distraction._sentences). Any manipulation that rewrites
+    # question_data["question"] must invalidate it with
+    # question_data.pop("_sentences", None).
 
 
     if manipulation == "add_distraction_sentence":
@@ -102,4 +124,115 @@ def question_manipulation(question_data, manipulation, model, temperature, n_bia
         return invert_final_question_and_answer(question_data=question_data, model='o3', temperature=temperature, api=api) 
 
     else:
-        raise ValueError(f"Unknown manipulation: {manipulation}")
\ No newline at end of file
+        raise ValueError(f"Unknown manipulation: {manipulation}")
+
+
+async def question_manipulation_async(question_data, manipulation, model, temperature, n_bias_styles: int = 1, additional_choices_num: int = 4, api: str = "client"):
+    """
+    Async counterpart of question_manipulation. Manipulations with a native
+    async path use it directly; pure-python manipulations run inline; the
+    remaining LLM-backed ones are delegated to a worker thread so they can
+    still overlap inside an asyncio.gather fan-out.
+    """
+    if manipulation == "add_distraction_sentence":
+        return await add_distraction_sentence_async(question_data=question_data, model=model, temperature=temperature)
+
+    elif manipulation == "add_none_of_the_options_are_correct":
+        return add_none_of_the_options_are_correct(question_data)
+
+    elif manipulation == "replace_correct_answer_to_none_of_the_options_are_correct":
+        return replace_correct_answer_to_none_of_the_options_are_correct(question_data)
+
+    else:
+        return await asyncio.to_thread(
+            question_manipulation, question_data, manipulation, model, temperature,
+            n_bias_styles=n_bias_styles, additional_choices_num=additional_choices_num, api=api,
+        )
+
+
+def question_manipulation_many(question_data_list, manipulation, model, temperature, max_workers: int = 32, **kwargs):
+    """
+    Thread-pool fan-out over question_manipulation for sync callers: the
+    blocking work is network I/O, so N waiting sockets overlap on OS
+    threads without the async refactor. Results keep input order; an item
+    that raises is logged and returned unmanipulated instead of failing
+    the whole batch.
+    """
+    def _one(question_data):
+        try:
+            return question_manipulation(question_data, manipulation, model, temperature, **kwargs)
+        except Exception as error:
+            print(f"[WARNING] {manipulation} failed for one question ({error}), returning original.")
+            return question_data
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_one, question_data_list))
+
+
+def question_manipulation_batch(question_data_list, manipulation, model, temperature, batch_size: int = 8, concurrency: int = 20, **kwargs):
+    """
+    Batch entry point for question_manipulation. Manipulations with a
+    row-marshaled multi-question prompt use it (one API call per batch_size
+    questions); the rest fall back to the concurrent per-question fan-out.
+    """
+    if manipulation == "add_distraction_sentence":
+        return add_distraction_sentences_batch(
+            question_data_list, model=model, temperature=temperature, batch_size=batch_size,
+        )
+    return run_manipulation_batch(question_data_list, manipulation, model, temperature, concurrency=concurrency, **kwargs)
+
+
+def question_manipulation_batch_api(question_data_list, manipulation, model, temperature, poll_interval: int = 60):
+    """
+    Offline variant of question_manipulation_batch on the OpenAI Batch API:
+    all prompts are uploaded as one batch job (50% pricing, separate
+    capacity from the synchronous RPM budget) and results are applied when
+    the job completes — typically minutes to hours, so only for dataset
+    generation where latency does not matter. Currently supports the
+    LLM-backed add_distraction_sentence manipulation; the pure-python
+    manipulations have no API cost to defer.
+    """
+    from agent_tools.batch_runner import BatchBuilder
+    from agent_tools.question_distraction import (
+        _DISTRACTION_SYSTEM_INSTRUCTIONS,
+        _build_distraction_user_prompt,
+        _insert_distraction,
+    )
+
+    if manipulation != "add_distraction_sentence":
+        raise ValueError(f"Batch API path not supported for manipulation: {manipulation}")
+
+    builder = BatchBuilder(model=model, temperature=temperature, poll_interval=poll_interval)
+    for i, question_data in enumerate(question_data_list):
+        builder.add(
+            custom_id=str(i),
+            user_msg=_build_distraction_user_prompt(question_data),
+            system_msg=_DISTRACTION_SYSTEM_INSTRUCTIONS,
+        )
+
+    results = builder.flush()
+    for i, question_data in enumerate(question_data_list):
+        sentence = results.get(str(i))
+        if sentence:
+            question_data["question"] = _insert_distraction(question_data["question"], sentence.strip())
+            question_data.pop("_sentences", None)
+    return question_data_list
+
+
+def run_manipulation_batch(question_data_list, manipulation, model, temperature, concurrency: int = 20, **kwargs):
+    """
+    Applies one manipulation to a whole list of questions concurrently,
+    bounded by a semaphore so in-flight requests stay under the provider's
+    rate limit. Wall-clock drops from sum-of-latencies to roughly
+    ceil(N / concurrency) round-trips. Returns results in input order.
+    """
+    async def _run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(question_data):
+            async with semaphore:
+                return await question_manipulation_async(question_data, manipulation, model, temperature, **kwargs)
+
+        return await asyncio.gather(*[_one(q) for q in question_data_list])
+
+    return asyncio.run(_run())
\ No newline at end of file
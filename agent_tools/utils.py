@@ -1,4 +1,8 @@
 from __future__ import annotations
+import functools
+import hashlib
+import json
+import re
 import pandas as pd
 import os
 import sys
@@ -21,34 +25,143 @@ if not validate_api_keys():
 gemini_api_key = os.getenv("GEMINI_API_KEY", "")
 deepseek_api_key = os.getenv("DEEPSEEK_API_KEY", "")
 
-from google import genai
-from google.genai import types
-import anthropic
-from openai import OpenAI
-from agents import Agent, Runner
+import httpx
+import asyncio
 
-client_openai = OpenAI()
-client_gemini = genai.Client(api_key=gemini_api_key)
-client_anthropic = anthropic.Anthropic()
-client_deepseek = OpenAI(api_key=deepseek_api_key, base_url="https://api.deepseek.com")
+# Shared connection pools so repeated calls reuse keep-alive connections
+# instead of paying a fresh TCP+TLS handshake; one sync and one async pool
+# are shared by all provider clients below. HTTP/2 multiplexes concurrent
+# requests over one socket, which matters under parallel dispatch.
+#
+# The provider SDKs themselves are imported lazily inside memoized
+# factories: each costs 50-300ms of import plus client construction, and a
+# typical run touches only one provider, so module import stays cheap and
+# subprocess workers re-importing this module don't pay for unused SDKs.
+_HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100)
 
+@functools.lru_cache(maxsize=1)
+def _sync_http_client():
+    return httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=120)
 
-def generate_response(question, model_name, temperature: float = 0):
-    instructions = (
-        "Answer the question with only the final letter choice (A, B, C, D, E, or F ...) with no explanation. "
-        "More than one choice can be correct, in which case return all of them separated by commas."
-    )
+@functools.lru_cache(maxsize=1)
+def _async_http_client():
+    return httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, timeout=120)
 
-    additional_instructions = (
-        "Answer **ONLY** with the capital letter(s) of the correct choice, "
-        "no spaces, no punctuation, no explanation. "
-        "If you add anything else you will score 0.\n"
-    )
 
+@functools.lru_cache(maxsize=1)
+def _openai_client():
+    from openai import OpenAI
+    return OpenAI(http_client=_sync_http_client())
+
+@functools.lru_cache(maxsize=1)
+def _openai_client_async():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(http_client=_async_http_client())
+
+@functools.lru_cache(maxsize=1)
+def _gemini_client():
+    from google import genai
+    return genai.Client(api_key=gemini_api_key)
+
+@functools.lru_cache(maxsize=1)
+def _anthropic_client():
+    import anthropic
+    return anthropic.Anthropic(http_client=_sync_http_client())
+
+@functools.lru_cache(maxsize=1)
+def _anthropic_client_async():
+    import anthropic
+    return anthropic.AsyncAnthropic(http_client=_async_http_client())
+
+@functools.lru_cache(maxsize=1)
+def _deepseek_client():
+    from openai import OpenAI
+    return OpenAI(api_key=deepseek_api_key, base_url="https://api.deepseek.com", http_client=_sync_http_client())
+
+@functools.lru_cache(maxsize=1)
+def _deepseek_client_async():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=deepseek_api_key, base_url="https://api.deepseek.com", http_client=_async_http_client())
+
+
+# Keep `from agent_tools.utils import client_openai` (and friends) working:
+# the module attribute resolves to the lazily built singleton on first use.
+_CLIENT_FACTORIES = {
+    "client_openai": _openai_client,
+    "client_openai_async": _openai_client_async,
+    "client_gemini": _gemini_client,
+    "client_anthropic": _anthropic_client,
+    "client_anthropic_async": _anthropic_client_async,
+    "client_deepseek": _deepseek_client,
+    "client_deepseek_async": _deepseek_client_async,
+}
+
+def __getattr__(name):
+    factory = _CLIENT_FACTORIES.get(name)
+    if factory is not None:
+        return factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _pack_batch(prompts, model: str = "gpt-4o", max_tokens: int = 6000, reserved_tokens: int = 0):
+    """
+    Split a list of prompts into batches whose combined token count stays
+    under max_tokens, so several items can share one API call instead of
+    one round-trip each. reserved_tokens is subtracted from the budget for
+    fixed overhead repeated on every call (typically the system prompt, so
+    callers can precompute it once). Returns a list of batches; each batch
+    is a list of (original_index, prompt) tuples so callers can re-align
+    responses.
+    """
+    budget = max_tokens - reserved_tokens
+
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for i, prompt in enumerate(prompts):
+        prompt_tokens = estimate_tokens(prompt, model)
+        if current_batch and current_tokens + prompt_tokens > budget:
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append((i, prompt))
+        current_tokens += prompt_tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+_ANSWER_INSTRUCTIONS = (
+    "Answer the question with only the final letter choice (A, B, C, D, E, or F ...) with no explanation. "
+    "More than one choice can be correct, in which case return all of them separated by commas."
+)
+
+_ANSWER_ADDITIONAL_INSTRUCTIONS = (
+    "Answer **ONLY** with the capital letter(s) of the correct choice, "
+    "no spaces, no punctuation, no explanation. "
+    "If you add anything else you will score 0.\n"
+)
+
+
+def _answer_call_kwargs(question, model_name, temperature):
+    # The stricter format rules go into the system message, not appended to
+    # the question: the user message stays byte-identical across models, so
+    # exact-match cache keys and provider prompt caches keep hitting, and
+    # instructions carry more weight in the system role anyway.
     if model_name.startswith("claude-sonnet") or model_name.startswith("deepseek"): # these models are not good at following instructions
-        question = question + "\n" + additional_instructions
+        system_msg = _ANSWER_INSTRUCTIONS + "\n" + _ANSWER_ADDITIONAL_INSTRUCTIONS
+    else:
+        system_msg = _ANSWER_INSTRUCTIONS
+    return {
+        "agent_name": model_name,
+        "user_msg": question,
+        "system_msg": system_msg,
+        "temperature": temperature,
+    }
+
 
-    response = call_agent(model_name, user_msg=question, system_msg=instructions, temperature=temperature)
+def generate_response(question, model_name, temperature: float = 0):
+    response = call_agent(**_answer_call_kwargs(question, model_name, temperature))
     # # Extract only the answer letter (A-Z)
     # import re
     # match = re.search(r'\b([A-Z])\b', response.upper())
@@ -61,35 +174,453 @@ def generate_response(question, model_name, temperature: float = 0):
 
     return response
 
-# todo: only a temporary solution, need to be replaced
-def call_openai_agent(agent_title: str, model: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", image_url=None) -> str:
-    # TODO: how to set temperature in agent?
-    agent = Agent(
+
+def generate_responses_batch(questions, model_name, temperature: float = 0,
+                             max_requests_per_minute: int = 500,
+                             max_tokens_per_minute: int = 90_000,
+                             results_path: str = None):
+    """
+    Answers a whole list of questions through the rate-limit-aware parallel
+    runner instead of one blocking call at a time. Results come back in
+    input order; with results_path set, a crashed run resumes from the
+    jsonl sidecar.
+    """
+    from agent_tools.parallel_processor import ParallelLLMRunner
+    runner = ParallelLLMRunner(
+        max_requests_per_minute=max_requests_per_minute,
+        max_tokens_per_minute=max_tokens_per_minute,
+        results_path=results_path,
+    )
+    return runner.run([_answer_call_kwargs(q, model_name, temperature) for q in questions])
+
+
+@functools.lru_cache(maxsize=128)
+def _get_agent(agent_title: str, model: str, system_msg: str):
+    """
+    Memoized Agent construction: in manipulation batches the (title, model,
+    instructions) triple is constant, so the SDK's validation and setup run
+    once instead of per call.
+    """
+    from agents import Agent
+    return Agent(
         name=agent_title,
         model=model,
         instructions=system_msg,
     )
-    # response = await Runner.run(agent, input=user_msg)
+
+
+# todo: only a temporary solution, need to be replaced
+def call_openai_agent(agent_title: str, model: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", image_url=None) -> str:
+    # TODO: how to set temperature in agent?
+    from agents import Runner
+    agent = _get_agent(agent_title, model, system_msg)
     response = Runner.run_sync(agent, input=user_msg)
     return response.final_output
 
-def call_agent(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1.0, image_url=None) -> str:
+
+async def call_openai_agent_async(agent_title: str, model: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", image_url=None) -> str:
+    """
+    Async variant for callers already inside an event loop, where
+    Runner.run_sync's thread bridge is both overhead and an error.
+    """
+    from agents import Runner
+    agent = _get_agent(agent_title, model, system_msg)
+    response = await Runner.run(agent, input=user_msg)
+    return response.final_output
+
+# Optional on-disk response cache for deterministic (temperature == 0) calls,
+# enabled with DAS_CACHE=1. Repeated runs of the same red-team prompts then
+# become 0-RTT cache hits instead of re-paying the full API latency and cost.
+_disk_cache = None
+
+def _get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        if os.getenv("DAS_CACHE") != "1":
+            _disk_cache = False
+        else:
+            try:
+                from agent_tools.llm_cache import LLMCache
+                _disk_cache = LLMCache()
+            except ImportError:
+                print("⚠️  DAS_CACHE=1 set but 'diskcache' is not installed. Continuing without cache.")
+                _disk_cache = False
+    return _disk_cache or None
+
+
+def _prompt_cache_key(system_msg: str) -> str:
+    """
+    Stable per-system-prompt key so OpenAI routes repeated calls with the
+    same (long, constant) system prompt to the same prompt-cache shard.
+    The system prompts are module-level constants, so the prefix is
+    byte-identical across calls and eligible for server-side caching.
+    """
+    return hashlib.sha1(system_msg.encode()).hexdigest()[:16]
+
+
+def _log_cached_tokens(response) -> None:
+    """Log the server-side prompt-cache hit-rate when DAS_CACHE_DEBUG=1."""
+    if os.getenv("DAS_CACHE_DEBUG") != "1":
+        return
+    try:
+        details = response.usage.input_tokens_details
+        print(f"[prompt-cache] cached_tokens={details.cached_tokens}/{response.usage.input_tokens}")
+        return
+    except AttributeError:
+        pass
+    try:
+        # Anthropic shape: cache reads/writes are separate usage fields.
+        usage = response.usage
+        print(f"[prompt-cache] cache_read={usage.cache_read_input_tokens} cache_write={usage.cache_creation_input_tokens} input={usage.input_tokens}")
+    except AttributeError:
+        pass
+
+
+def _anthropic_prompt_kwargs(system_msg: str, user_msg: str) -> dict:
+    """
+    system/messages kwargs with `cache_control` markers, so repeated calls
+    sharing the same system prompt and case text reuse the server-side KV
+    cache (cache reads bill ~10% of normal input tokens) instead of
+    re-prefilling the prompt every vote.
+    """
+    return {
+        "system": [
+            {"type": "text", "text": system_msg, "cache_control": {"type": "ephemeral"}},
+        ],
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": user_msg, "cache_control": {"type": "ephemeral"}},
+                ],
+            }
+        ],
+    }
+
+
+# Heuristic start-of-record markers: a markdown "**Patient Name:**" header or
+# a "---" horizontal rule separating the request from an appended record.
+_RECORD_START_RE = re.compile(r"\n\s*(?:\*\*Patient Name:\*\*|---\s*\n)")
+
+def split_request_and_record(prompt: str):
+    """
+    Splits a prompt into (request_text, appended_record). The appended
+    record is the verbatim patient-record block (if any) that trails the
+    actual request; callers can send only the request plus a placeholder to
+    the model and re-splice the record locally, cutting prompt tokens by
+    the size of the record. Returns ("", record="") semantics: when no
+    record marker is found, appended_record is an empty string.
+    """
+    match = _RECORD_START_RE.search(prompt)
+    if match is None:
+        return prompt, ""
+    return prompt[:match.start()], prompt[match.start():].lstrip("\n")
+
+
+def _replace_record_with_sentinel(request_text: str, appended_record: str, original_prompt: str):
+    """
+    When a prompt carries an appended patient record, the model gets only
+    the request plus a short placeholder; the record stays local. Returns
+    (user_msg, sentinel), with sentinel None when there is no record.
+    """
+    if not appended_record:
+        return original_prompt, None
+    sentinel = f"<<APPENDED_RECORD OMITTED ({len(appended_record)} chars)>>"
+    return request_text.rstrip() + "\n\n" + sentinel, sentinel
+
+
+def _resplice_record(modified_prompt: str, sentinel, appended_record: str) -> str:
+    """Re-inserts the verbatim appended record into the model's output."""
+    if not appended_record or sentinel is None:
+        return modified_prompt
+    if sentinel in modified_prompt:
+        return modified_prompt.replace(sentinel, appended_record)
+    if appended_record in modified_prompt:
+        # already contains the record (e.g. a parse failure returned the
+        # original prompt unchanged)
+        return modified_prompt
+    return modified_prompt.rstrip() + "\n\n" + appended_record
+
+
+@functools.lru_cache(maxsize=None)
+def _encoder(model: str = "gpt-4o"):
+    """Per-process tiktoken encoder cache; construction costs ~100ms."""
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count of `text`, falling back to chars/4 without tiktoken."""
+    try:
+        return len(_encoder(model).encode(text))
+    except Exception:
+        return len(text) // 4
+
+
+# These models ignore the temperature parameter, so their responses are as
+# deterministic as a temperature == 0 call and equally cacheable.
+_TEMPERATURE_IGNORING_MODELS = {"o1", "o3", "o4-mini", "o3-mini", "o1-mini", "o1-pro"}
+
+
+def _dispatch_agent_call(agent_name: str, user_msg: str, system_msg: str, temperature, image_url, response_format, max_output_tokens=None) -> str:
+    # O(1) hash lookup for the OpenAI model names, then a short prefix scan
+    # for the other providers; the route tables live at the bottom of the
+    # module, after the client functions they reference.
+    if agent_name in _OPENAI_MODELS:
+        return call_gpt_client(agent_name, user_msg, system_msg, temperature, image_url, response_format, max_output_tokens)
+    for prefix, client_fn in _PREFIX_ROUTES:
+        if agent_name.startswith(prefix):
+            return client_fn(agent_name, user_msg, system_msg, temperature, image_url, max_output_tokens)
+    raise ValueError(f"Unsupported agent name: {agent_name}")
+
+
+@functools.lru_cache(maxsize=4096)
+def _call_agent_cached(agent_name: str, user_msg: str, system_msg: str, response_format_json, max_output_tokens=None) -> str:
+    """
+    In-process memo for deterministic (temperature == 0) calls: an identical
+    (model, system_msg, user_msg) triple within one run returns in ~µs
+    instead of re-hitting the API. Sits in front of the optional disk cache.
+    """
+    response_format = json.loads(response_format_json) if response_format_json else None
+
+    cache = _get_disk_cache()
+    if cache is not None:
+        cache_key = cache.make_key(
+            agent_name, system_msg, user_msg,
+            response_format=response_format, max_output_tokens=max_output_tokens,
+        )
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+    response = _dispatch_agent_call(agent_name, user_msg, system_msg, 0, None, response_format, max_output_tokens)
+
+    if cache is not None:
+        cache.set(cache_key, response)
+    return response
+
+
+# Lazily built singleton for the embedding-based cache; only calls that
+# pass semantic_cache=True ever touch it.
+_semantic_cache = None
+
+def _get_semantic_cache():
+    global _semantic_cache
+    if _semantic_cache is None:
+        from agent_tools.llm_cache import SemanticLLMCache
+        _semantic_cache = SemanticLLMCache()
+    return _semantic_cache
+
+
+def _sample_agent_calls(agent_name, user_msg, system_msg, temperature, n, max_output_tokens=None):
+    """
+    Draws n completions for one identical prompt. Non-reasoning OpenAI
+    models use the Chat Completions `n` parameter, so the prompt is sent
+    (and prefilled server-side) once for all n samples instead of n
+    round-trips. Providers without `n` fall back to a concurrent fan-out.
+    """
+    if agent_name in _OPENAI_MODELS and agent_name not in _TEMPERATURE_IGNORING_MODELS:
+        kwargs = {"temperature": temperature}
+        if max_output_tokens is not None:
+            kwargs["max_tokens"] = max_output_tokens
+        completion = _openai_client().chat.completions.create(
+            model=agent_name,
+            messages=[
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_msg},
+            ],
+            n=n,
+            **kwargs,
+        )
+        return [choice.message.content for choice in completion.choices]
+
+    calls = [
+        dict(agent_name=agent_name, user_msg=user_msg, system_msg=system_msg,
+             temperature=temperature, max_output_tokens=max_output_tokens)
+        for _ in range(n)
+    ]
+    return asyncio.run(gather_agent_calls(calls, concurrency=n))
+
+
+def call_agent(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1.0, image_url=None, response_format=None, max_output_tokens=None, semantic_cache: bool = False, n: int = 1) -> str:
     """
     Generic helper to call one of our "agents" (GPT-4o, etc.)
     based on the user’s environment. Adjust your client call here.
+    `response_format` is an OpenAI structured-output format dict (Responses
+    API shape); it is honored for OpenAI models and ignored elsewhere.
+    `max_output_tokens` bounds the completion length (all providers), so a
+    misbehaving model cannot blow p99 latency/cost up to the context cap.
+    `semantic_cache=True` additionally serves cosine-similar prompts from
+    the embedding cache — opt in only where a paraphrased prompt really
+    should reuse the same completion.
+    With `n > 1`, returns a list of n sampled completions for the same
+    prompt (one HTTP round-trip where the provider supports it); voting
+    loops should prefer this over n sequential calls.
+    """
+    if n > 1:
+        # Multi-sample calls reuse the disk cache too: the full list of n
+        # completions is stored under one key, so re-runs and sibling
+        # manipulation modes sharing the same prompt skip all n samples.
+        deterministic = temperature == 0 or agent_name in _TEMPERATURE_IGNORING_MODELS
+        cache = _get_disk_cache() if deterministic and os.getenv("DAS_NO_CACHE") != "1" else None
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(agent_name, system_msg, user_msg, image_url, response_format, max_output_tokens, n=n)
+            hit = cache.get(cache_key)
+            if hit is not None:
+                return list(hit)
+        samples = _sample_agent_calls(agent_name, user_msg, system_msg, temperature, n, max_output_tokens)
+        if cache is not None:
+            cache.set(cache_key, samples)
+        return samples
+    # Only (near-)deterministic calls are cached: temperature == 0, or a
+    # reasoning model that ignores the temperature parameter entirely.
+    deterministic = temperature == 0 or agent_name in _TEMPERATURE_IGNORING_MODELS
+    if deterministic and image_url is None and os.getenv("DAS_NO_CACHE") != "1":
+        response_format_json = json.dumps(response_format, sort_keys=True) if response_format is not None else None
+        if semantic_cache:
+            cache = _get_semantic_cache()
+            scope = f"{agent_name}|{_prompt_cache_key(system_msg)}"
+            hit = cache.get(scope, user_msg)
+            if hit is not None:
+                return hit
+            response = _call_agent_cached(agent_name, user_msg, system_msg, response_format_json, max_output_tokens)
+            cache.add(scope, user_msg, response)
+            return response
+        return _call_agent_cached(agent_name, user_msg, system_msg, response_format_json, max_output_tokens)
+
+    return _dispatch_agent_call(agent_name, user_msg, system_msg, temperature, image_url, response_format, max_output_tokens)
+
+async def call_agent_async(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1.0, image_url=None, response_format=None, max_output_tokens=None) -> str:
+    """
+    Async counterpart of call_agent, so callers can fan out several
+    independent LLM calls with asyncio.gather instead of serial round-trips.
+    Every provider is served by its native async client, so a whole batch
+    can be in flight on one event loop without worker threads.
     """
-    if agent_name in ["gpt-4o", "o1", "o3", "o4-mini", "o3-mini", "gpt-4.1", "gpt-4.1-mini", "o1-mini", "o1-pro"]:
-        return call_gpt_client(agent_name, user_msg, system_msg, temperature, image_url)
-    elif agent_name.startswith("gemini"):
-        return call_gemini_client(agent_name, user_msg, system_msg, temperature, image_url)
-    elif agent_name.startswith("deepseek"):
-        return call_deepseek_client(agent_name, user_msg, system_msg, temperature, image_url)
-    elif agent_name.startswith("claude"):
-        return call_anthropic_client(agent_name, user_msg, system_msg, temperature, image_url)
+    if agent_name in _OPENAI_MODELS:
+        return await call_gpt_client_async(agent_name, user_msg, system_msg, temperature, image_url, response_format, max_output_tokens)
+    for prefix, client_fn in _PREFIX_ROUTES_ASYNC:
+        if agent_name.startswith(prefix):
+            return await client_fn(agent_name, user_msg, system_msg, temperature, image_url, max_output_tokens)
+    raise ValueError(f"Unsupported agent name: {agent_name}")
+
+
+async def gather_agent_calls(calls, concurrency: int = 20):
+    """
+    Runs many call_agent_async invocations concurrently with a bounded
+    semaphore, returning results in input order. `calls` is an iterable of
+    kwargs dicts for call_agent_async. Concurrency should stay below the
+    provider's RPM ceiling divided by the expected per-call latency.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _bounded(kwargs):
+        async with semaphore:
+            return await call_agent_async(**kwargs)
+
+    return await asyncio.gather(*[_bounded(kwargs) for kwargs in calls])
+
+
+async def call_gpt_client_async(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None, response_format=None, max_output_tokens=None) -> str:
+    """
+    Async version of call_gpt_client, sharing one AsyncOpenAI client.
+    """
+    if image_url is None:
+        input = [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_msg}
+                ]
+    else:
+        input = [
+                    {"role": "system", "content": system_msg},
+                    {"role": "user", "content":
+                        [
+                        {"type": "input_text", "text": user_msg},
+                        {"type": "input_image", "image_url": image_url},
+                        ],
+                    }
+                ]
+
+    format_kwargs = {"text": {"format": response_format}} if response_format is not None else {}
+    if max_output_tokens is not None:
+        format_kwargs["max_output_tokens"] = max_output_tokens
+
+    if agent_name in ['o3-mini', "o4-mini", "o3"]:
+        response = await _openai_client_async().responses.create(
+            model=agent_name,
+            input=input,
+            extra_body={"prompt_cache_key": _prompt_cache_key(system_msg)},
+            **format_kwargs,
+        )
+    elif agent_name in ["gpt-4o", "gpt-4o-mini", "gpt-4.1-mini", "gpt-4.1"]:
+        response = await _openai_client_async().responses.create(
+            model=agent_name,
+            input=input,
+            temperature=temperature,
+            extra_body={"prompt_cache_key": _prompt_cache_key(system_msg)},
+            **format_kwargs,
+        )
     else:
+        # todo: sort out the rest of the models
         raise ValueError(f"Unsupported agent name: {agent_name}")
-    
-def call_deepseek_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None) -> str:
+
+    _log_cached_tokens(response)
+    return _response_text(response)
+
+
+async def call_deepseek_client_async(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None, max_output_tokens=None) -> str:
+    """
+    Async version of call_deepseek_client, sharing one AsyncOpenAI client.
+    """
+    input = [
+            {"role": "system", "content": system_msg},
+            {"role": "user", "content": user_msg}
+            ]
+
+    response = await _deepseek_client_async().chat.completions.create(
+        model=agent_name,
+        messages=input,
+        temperature=temperature,
+        **({"max_tokens": max_output_tokens} if max_output_tokens is not None else {}),
+    )
+    return response.choices[0].message.content
+
+
+async def call_gemini_client_async(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None, max_output_tokens=None) -> str:
+    """
+    Async version of call_gemini_client, via the genai client's aio surface.
+    """
+    from google.genai import types
+    response = await _gemini_client().aio.models.generate_content(
+        model=agent_name,
+        config=types.GenerateContentConfig(
+            system_instruction=system_msg,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens),
+        contents=user_msg,
+    )
+    return response.text
+
+
+async def call_anthropic_client_async(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None, max_output_tokens=None) -> str:
+    """
+    Async version of call_anthropic_client, via AsyncAnthropic.
+    """
+    response = await _anthropic_client_async().messages.create(
+        model=agent_name,
+        max_tokens=max_output_tokens if max_output_tokens is not None else 5000,
+        temperature=temperature,
+        **_anthropic_prompt_kwargs(system_msg, user_msg),
+    )
+    _log_cached_tokens(response)
+    return response.content[0].text
+
+
+def call_deepseek_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None, max_output_tokens=None) -> str:
     """
     Generic helper to call one of our "agents" (DeepSeek-V3, etc.)
     based on the user's environment. Adjust your client call here.
@@ -110,18 +641,48 @@ def call_deepseek_client(agent_name: str, user_msg: str, system_msg: str = "Your
                 }
             ]
 
-    response = client_deepseek.chat.completions.create(
+    response = _deepseek_client().chat.completions.create(
         model=agent_name,
         messages=input,
         temperature=temperature,
+        **({"max_tokens": max_output_tokens} if max_output_tokens is not None else {}),
     )
     return response.choices[0].message.content
 
 
-def call_gpt_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None) -> str:
+
+def _response_text(response) -> str:
+    """
+    Pulls the text of a single-message Responses API reply by direct
+    indexing; the SDK's output_text property re-walks and joins the whole
+    output tree on every access. Strips only when whitespace is actually
+    present, avoiding a new allocation on clean responses.
+    """
+    try:
+        text = response.output[0].content[0].text
+    except (AttributeError, IndexError):
+        text = response.output_text
+    if text[:1].isspace() or text[-1:].isspace():
+        return text.strip()
+    return text
+
+
+def _iter_gpt_stream(stream):
+    """Yields output-text deltas from a Responses API stream."""
+    try:
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                yield event.delta
+    finally:
+        stream.close()
+
+
+def call_gpt_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature=1, image_url=None, response_format=None, max_output_tokens=None, stream: bool = False):
     """
     Generic helper to call one of our "agents" (GPT-4o, etc.)
     based on the user's environment. Adjust your client call here.
+    With stream=True, returns a generator of text deltas instead of the
+    final string, so callers can overlap their own work with token arrival.
     """
     if image_url is None:
         input = [
@@ -139,60 +700,98 @@ def call_gpt_client(agent_name: str, user_msg: str, system_msg: str = "Your are
                     }
                 ]
 
+    format_kwargs = {"text": {"format": response_format}} if response_format is not None else {}
+    if max_output_tokens is not None:
+        format_kwargs["max_output_tokens"] = max_output_tokens
+    if stream:
+        format_kwargs["stream"] = True
+
     if agent_name in ['o3-mini', "o4-mini", "o3"]:
         # print(f"[WARNING] 'temperature' is not supported with {agent_name}, using default value.")
-        response = client_openai.responses.create(
+        response = _openai_client().responses.create(
             model=agent_name,
-            input=input
+            input=input,
+            extra_body={"prompt_cache_key": _prompt_cache_key(system_msg)},
+            **format_kwargs,
         )
-    elif agent_name in ["gpt-4o", "gpt-4.1-mini", "gpt-4.1"]:
-        response = client_openai.responses.create(
+    elif agent_name in ["gpt-4o", "gpt-4o-mini", "gpt-4.1-mini", "gpt-4.1"]:
+        response = _openai_client().responses.create(
             model=agent_name,
             input=input,
             temperature=temperature,
+            extra_body={"prompt_cache_key": _prompt_cache_key(system_msg)},
+            **format_kwargs,
         )
     else:
         # todo: sort out the rest of the models
         raise ValueError(f"Unsupported agent name: {agent_name}")
 
-    return response.output_text.strip()
+    if stream:
+        return _iter_gpt_stream(response)
+
+    _log_cached_tokens(response)
+    return _response_text(response)
 
-def call_gemini_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature = 1, image_url=None) -> str:
+def call_gemini_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature = 1, image_url=None, max_output_tokens=None) -> str:
     """
     Generic helper to call one of our "agents" (Gemini, etc.)
     based on the user's environment. Adjust your client call here.
     """
-    response = client_gemini.models.generate_content(
+    from google.genai import types
+    response = _gemini_client().models.generate_content(
         model=agent_name,
         config=types.GenerateContentConfig(
             system_instruction=system_msg,
-            temperature=temperature),
+            temperature=temperature,
+            max_output_tokens=max_output_tokens),
         contents=user_msg,
     )
     return response.text
 
-def call_anthropic_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature = 1, image_url=None) -> str:
+def _iter_anthropic_stream(agent_name, user_msg, system_msg, temperature, max_output_tokens):
+    with _anthropic_client().messages.stream(
+        model=agent_name,
+        max_tokens=max_output_tokens if max_output_tokens is not None else 5000,
+        temperature=temperature,
+        **_anthropic_prompt_kwargs(system_msg, user_msg),
+    ) as stream:
+        for text in stream.text_stream:
+            yield text
+
+
+def call_anthropic_client(agent_name: str, user_msg: str, system_msg: str = "Your are a helpful assistant.", temperature = 1, image_url=None, max_output_tokens=None, stream: bool = False):
     """
     Generic helper to call one of our "agents" (Gemini, etc.)
     based on the user's environment. Adjust your client call here.
+    With stream=True, returns a generator of text deltas.
     """
-    response = client_anthropic.messages.create(
+    if stream:
+        return _iter_anthropic_stream(agent_name, user_msg, system_msg, temperature, max_output_tokens)
+
+    response = _anthropic_client().messages.create(
         model=agent_name,
-        max_tokens=5000,
+        max_tokens=max_output_tokens if max_output_tokens is not None else 5000,
         temperature=temperature,
-        system=system_msg,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": user_msg
-                    }
-                ]
-            }
-        ]
+        **_anthropic_prompt_kwargs(system_msg, user_msg),
     )
+    _log_cached_tokens(response)
     return response.content[0].text
 
 
+
+# Route tables for the dispatchers above: a frozenset membership test for
+# the OpenAI model names and an ordered prefix scan for the rest.
+_OPENAI_MODELS = frozenset([
+    "gpt-4o", "gpt-4o-mini", "o1", "o3", "o4-mini", "o3-mini",
+    "gpt-4.1", "gpt-4.1-mini", "o1-mini", "o1-pro",
+])
+_PREFIX_ROUTES = (
+    ("gemini", call_gemini_client),
+    ("deepseek", call_deepseek_client),
+    ("claude", call_anthropic_client),
+)
+_PREFIX_ROUTES_ASYNC = (
+    ("gemini", call_gemini_client_async),
+    ("deepseek", call_deepseek_client_async),
+    ("claude", call_anthropic_client_async),
+)
@@ -7,6 +7,50 @@ from datetime import datetime
 
 TOTAL_TEST_NUM = 415
 
+# Block size for the backward reader below.
+_TAIL_CHUNK = 64 * 1024
+
+
+def _summary_from_tail(text: str) -> Optional[Set[str]]:
+    """
+    Searches a tail fragment of a log file for the last record whose
+    ``failed_cases`` value is a list. Handles both JSONL (one object per
+    line) and the pretty-printed JSON-array format written by
+    ``append_json_record`` (each object starts on its own ``{`` line).
+    """
+    text = text.rstrip()
+    if text.endswith("]"):
+        # JSON-array log: drop the closing bracket so the last element
+        # becomes a parseable standalone object.
+        text = text[:-1].rstrip()
+
+    # JSONL: the summary is a complete line.
+    for line in reversed(text.splitlines()):
+        line = line.strip().rstrip(",")
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(rec, dict) and isinstance(rec.get("failed_cases"), list):
+            return set(rec["failed_cases"])
+
+    # Pretty-printed array: objects start at column 0 on a "{" line.
+    idx = text.rfind("\n{")
+    while idx != -1:
+        candidate = text[idx + 1:].rstrip().rstrip(",")
+        try:
+            rec = json.loads(candidate)
+            if isinstance(rec, dict) and isinstance(rec.get("failed_cases"), list):
+                return set(rec["failed_cases"])
+        except json.JSONDecodeError:
+            pass
+        idx = text.rfind("\n{", 0, idx)
+
+    return None
+
+
 def get_failed_cases_from_log(log_file_path: str) -> Optional[Set[str]]:
     """
     Extracts the ``failed_cases`` list from either a JSON *or* JSON‑Lines
@@ -34,9 +78,24 @@ def get_failed_cases_from_log(log_file_path: str) -> Optional[Set[str]]:
         A set of failed case IDs if found, otherwise ``None``.
     """
     try:
-        # Read the entire file contents once
-        with open(log_file_path, "r", encoding="utf-8") as f:
-            raw_text = f.read()
+        # ---------- 0) Reverse-seek: the summary sits at the end ----------
+        # Read fixed-size blocks backward from EOF; on multi-MB logs this
+        # touches only the last few KB instead of the whole file.
+        with open(log_file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            buffer = b""
+            while pos > 0:
+                read_from = max(0, pos - _TAIL_CHUNK)
+                f.seek(read_from)
+                buffer = f.read(pos - read_from) + buffer
+                pos = read_from
+                found = _summary_from_tail(buffer.decode("utf-8", errors="replace"))
+                if found is not None:
+                    return found
+        # The whole file is now in `buffer`; fall back to the full-parse
+        # path for legacy layouts (e.g. a summary that is not last).
+        raw_text = buffer.decode("utf-8", errors="replace")
 
         # ---------- 1) Try to parse the whole file as JSON ----------
         try:
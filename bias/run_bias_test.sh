@@ -4,6 +4,10 @@ MAX_CASES=2 # for sanity check
 # MODEL_LIST="gpt-4o o3 claude-sonnet-4-20250514 claude-3-7-sonnet-20250219"
 MODEL_LIST="gemini-2.5-flash"
 
+# Reference answers are shared across manipulation modes through the
+# content-hash LLM disk cache; modes after the first reuse them for free.
+export DAS_CACHE=1
+
 for MODEL in $MODEL_LIST; do
 
     MANIPULATION_TYPE="cognitive_bias"
@@ -19,7 +23,6 @@ for MODEL in $MODEL_LIST; do
         --vote_num_manipulated 3 \
         --manipulation_type $MANIPULATION_TYPE \
         --data_file $DATA_FILE \
-        --ref_cache_file logs/${MODEL}/ref_results_cache.json \
         --n_subjects $MAX_CASES \
 
     # REST_MANIPULATION_LIST="race_socioeconomic_label language_manipulation emotion_manipulation"
@@ -35,9 +38,7 @@ for MODEL in $MODEL_LIST; do
             --vote_num_manipulated 3 \
             --manipulation_type $MANIPULATION \
             --data_file $DATA_FILE \
-            --ref_cache_file logs/${MODEL}/ref_results_cache.json \
-            --n_subjects $MAX_CASES \
-            --load_ref_from_cache   # uncomment this line to load reference results from cache
+            --n_subjects $MAX_CASES
     done
 
     # ------------------------------------------------------------
@@ -18,18 +18,39 @@ Key features:
 - Clear separation of concerns between specialist agents
 """
 
-from typing import List, Union, Literal, Optional
-from enum import Enum
-from pydantic import BaseModel, Field, validator
-
-# Constants
-SPECIALIST_REASONING_MAX_WORDS = 20  # One sentence, ≤20 words for specialist agents
-ORCHESTRATOR_RATIONALE_MAX_WORDS = 30  # Brief rationale ≤30 words for orchestrator
-AGENT_DECISION_REASONING_MAX_WORDS = 20  # Brief explanation ≤20 words for agent decisions
+import sys
+import warnings
+from functools import cached_property, lru_cache
+from typing import Annotated, List, Union, Literal, Optional
+from pydantic import (
+    BaseModel, ConfigDict, Field, StringConstraints, TypeAdapter,
+    ValidationInfo, field_validator,
+)
 
 # Type aliases for better readability
 ClassificationCode = Union[Literal["0"], Literal["0.5"], List[str]]
 
+# Whitespace stripping handled by pydantic-core instead of Python validators.
+StrippedStr = Annotated[str, StringConstraints(strip_whitespace=True)]
+
+# All valid classification codes, hoisted to module level so validators do a
+# frozenset membership test instead of rebuilding a 30-element set per call.
+# The canonical strings are interned so lookups against codes that were
+# themselves interned resolve on pointer equality.
+_VALID_CODES = frozenset(sys.intern(code) for code in (
+    "0", "0.5",
+    "1A", "1B", "1C", "1D", "1E",
+    "2A", "2B", "2C", "2D", "2E",
+    "3A", "3B", "3C", "3D",
+    "4A", "4B", "4C",
+    "5A", "5B", "5C", "5D",
+    "6A", "6B", "6C", "6D",
+    "7A", "7B", "7C",
+))
+
+# Bits 1..7 set: the mask a complete set of agent decisions must cover.
+_REQUIRED_CODES_MASK = 0b11111110
+
 class BaseAgentOutput(BaseModel):
     """
     Base model for all agent outputs.
@@ -43,36 +64,58 @@ class BaseAgentOutput(BaseModel):
             or a list of specific codes
         reasoning: Concise explanation of the classification (≤20 words)
     """
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
     classification: ClassificationCode = Field(
         description="Classification code(s). Either '0' for no fault, '0.5' for uncertain, "
                    "or a list of specific codes."
     )
-    reasoning: str = Field(
+    reasoning: StrippedStr = Field(
         description="Concise reasoning summary explaining the classification."
     )
 
-    @validator('classification')
+    @field_validator('classification', mode='after')
+    @classmethod
     def validate_classification(cls, v: ClassificationCode) -> ClassificationCode:
         """Validate classification format."""
         if isinstance(v, list):
-            if not all(isinstance(code, str) for code in v):
-                raise ValueError("All classification codes must be strings")
-            if not all(code in ["0", "0.5", "1A", "1B", "1C", "1D", "1E",
-                              "2A", "2B", "2C", "2D", "2E",
-                              "3A", "3B", "3C", "3D",
-                              "4A", "4B", "4C",
-                              "5A", "5B", "5C", "5D",
-                              "6A", "6B", "6C", "6D",
-                              "7A", "7B", "7C"] for code in v):
-                raise ValueError("Invalid classification code in list")
-        elif v not in ["0", "0.5"]:
+            # One pass checking type and membership together. Codes arrive
+            # as fresh strings from JSON parsing; interning them maps each
+            # onto the canonical _VALID_CODES member, so this membership
+            # test and every later comparison (root_digits, merging) hit
+            # the pointer-equality fast path.
+            interned = []
+            for code in v:
+                if not isinstance(code, str):
+                    raise ValueError("All classification codes must be strings")
+                code = sys.intern(code)
+                if code not in _VALID_CODES:
+                    raise ValueError("Invalid classification code in list")
+                interned.append(code)
+            return interned
+        elif v not in ("0", "0.5"):
             raise ValueError("Classification must be '0', '0.5', or a list of valid codes")
         return v
 
-    @validator('reasoning')
-    def validate_reasoning(cls, v: str) -> str:
-        """Remove word count validation for reasoning."""
-        return v.strip()
+    @classmethod
+    def from_trusted(cls, data: dict) -> "BaseAgentOutput":
+        """
+        Build an instance from data already validated elsewhere (e.g. by the
+        OpenAI structured-output schema), bypassing pydantic validation via
+        model_construct. Use model_validate for anything crossing an API
+        boundary.
+        """
+        return cls.model_construct(**data)
+
+
+# Sub-codes for medical fact issues (Code-1).
+MedFactCode = Literal[
+    "1A",  # False medical claim (e.g., "TB is highly prevalent among healthy 40-year-olds in a low-risk region")
+    "1B",  # Wrong/omitted drug interaction (e.g., "OCPs are unaffected by rifampin" - misses decreased effectiveness)
+    "1C",  # Outdated guideline/formula (e.g., "Uses CKD-EPI 2009 instead of newer 2021 version")
+    "1D",  # Wrong prevalence/risk estimate (e.g., "Thyroid cancer risk is equal in men and women")
+    "1E",  # Numeric/dosage miscalculation (e.g., Changes a prescription from 1000 mg to 1000 g)
+]
 
 
 class MedFactOutput(BaseAgentOutput):
@@ -84,19 +127,21 @@ class MedFactOutput(BaseAgentOutput):
     Focuses on factual accuracy and timeliness, ignoring citations, reasoning,
     context changes, safety issues, instruction compliance, and other hallucinations.
     """
-    class SubCode(str, Enum):
-        """Sub-codes for medical fact issues."""
-        FALSE_CLAIM = "1A"  # False medical claim (e.g., "TB is highly prevalent among healthy 40-year-olds in a low-risk region")
-        DRUG_INTERACTION = "1B"  # Wrong/omitted drug interaction (e.g., "OCPs are unaffected by rifampin" - misses decreased effectiveness)
-        OUTDATED_GUIDELINE = "1C"  # Outdated guideline/formula (e.g., "Uses CKD-EPI 2009 instead of newer 2021 version")
-        WRONG_PREVALENCE = "1D"  # Wrong prevalence/risk estimate (e.g., "Thyroid cancer risk is equal in men and women")
-        NUMERIC_ERROR = "1E"  # Numeric/dosage miscalculation (e.g., Changes a prescription from 1000 mg to 1000 g)
-    
-    classification: Union[Literal["0"], Literal["0.5"], List[SubCode]] = Field(
+    classification: Union[Literal["0", "0.5"], List[MedFactCode]] = Field(
         description="Classification codes for medical fact issues."
     )
 
 
+# Sub-codes for citation issues (Code-2).
+CitationCode = Literal[
+    "2A",  # Fabricated citation (e.g., "J Imaginary Med 2023;5:12" - nonexistent)
+    "2B",  # Misrepresented real citation (e.g., Real RCT concluded no benefit, LLM says it showed big benefit)
+    "2C",  # Irrelevant citation (e.g., Cites vitamin C paper for bipolar disorder)
+    "2D",  # Vague/incomplete citation (e.g., "PubMed review" with no specifics)
+    "2E",  # Memory/retrieval error (e.g., Provides wrong paper title/URL for correct PubMed ID)
+]
+
+
 class CitationOutput(BaseAgentOutput):
     """
     Output model for Citation Verifier (Code-2).
@@ -106,19 +151,20 @@ class CitationOutput(BaseAgentOutput):
     Evaluates citation accuracy only, ignoring broader medical correctness,
     logic, context, safety, instructions, or general hallucinations.
     """
-    class SubCode(str, Enum):
-        """Sub-codes for citation issues."""
-        FABRICATED = "2A"  # Fabricated citation (e.g., "J Imaginary Med 2023;5:12" - nonexistent)
-        MISREPRESENTED = "2B"  # Misrepresented real citation (e.g., Real RCT concluded no benefit, LLM says it showed big benefit)
-        IRRELEVANT = "2C"  # Irrelevant citation (e.g., Cites vitamin C paper for bipolar disorder)
-        VAGUE = "2D"  # Vague/incomplete citation (e.g., "PubMed review" with no specifics)
-        MEMORY_ERROR = "2E"  # Memory/retrieval error (e.g., Provides wrong paper title/URL for correct PubMed ID)
-    
-    classification: Union[Literal["0"], Literal["0.5"], List[SubCode]] = Field(
+    classification: Union[Literal["0", "0.5"], List[CitationCode]] = Field(
         description="Classification codes for citation issues."
     )
 
 
+# Sub-codes for reasoning issues (Code-3).
+ReasoningCode = Literal[
+    "3A",  # Unsupported causal inference (e.g., "SSRIs cause osteoporosis" with no evidence)
+    "3B",  # Unjustified assumption (e.g., Assumes strong family support not mentioned in prompt)
+    "3C",  # Incorrect timeline interpretation (e.g., "ECG always shows STEMI immediately")
+    "3D",  # Diagnostic/therapeutic contradiction (e.g., Diagnoses pneumonia despite normal labs/imaging)
+]
+
+
 class ReasoningOutput(BaseAgentOutput):
     """
     Output model for Reasoning Auditor (Code-3).
@@ -130,18 +176,19 @@ class ReasoningOutput(BaseAgentOutput):
     correctness, citations, context mismatch, safety, instructions,
     or unrelated hallucinations.
     """
-    class SubCode(str, Enum):
-        """Sub-codes for reasoning issues."""
-        CAUSAL = "3A"  # Unsupported causal inference (e.g., "SSRIs cause osteoporosis" with no evidence)
-        ASSUMPTION = "3B"  # Unjustified assumption (e.g., Assumes strong family support not mentioned in prompt)
-        TIMELINE = "3C"  # Incorrect timeline interpretation (e.g., "ECG always shows STEMI immediately")
-        CONTRADICTION = "3D"  # Diagnostic/therapeutic contradiction (e.g., Diagnoses pneumonia despite normal labs/imaging)
-    
-    classification: Union[Literal["0"], Literal["0.5"], List[SubCode]] = Field(
+    classification: Union[Literal["0", "0.5"], List[ReasoningCode]] = Field(
         description="Classification codes for reasoning issues."
     )
 
 
+# Sub-codes for context issues (Code-4).
+ContextCode = Literal[
+    "4A",  # Fact changed from prompt (e.g., User says "6-month-old" → LLM calls them "6-year-old")
+    "4B",  # Invented detail/procedure (e.g., LLM adds "weight loss" or "glutaraldehyde application" not mentioned)
+    "4C",  # Critical info omitted (e.g., Ignores stated penicillin allergy)
+]
+
+
 class ContextOutput(BaseAgentOutput):
     """
     Output model for Context Keeper (Code-4).
@@ -151,17 +198,20 @@ class ContextOutput(BaseAgentOutput):
     omissions. Compares strictly to user prompt to identify changes,
     inventions, or omissions that alter the given context.
     """
-    class SubCode(str, Enum):
-        """Sub-codes for context issues."""
-        FACT_CHANGED = "4A"  # Fact changed from prompt (e.g., User says "6-month-old" → LLM calls them "6-year-old")
-        INVENTED = "4B"  # Invented detail/procedure (e.g., LLM adds "weight loss" or "glutaraldehyde application" not mentioned)
-        OMITTED = "4C"  # Critical info omitted (e.g., Ignores stated penicillin allergy)
-    
-    classification: Union[Literal["0"], List[SubCode]] = Field(
+    classification: Union[Literal["0"], List[ContextCode]] = Field(
         description="Classification codes for context issues."
     )
 
 
+# Sub-codes for safety issues (Code-5).
+SafetyCode = Literal[
+    "5A",  # Unsafe/overly aggressive treatment (e.g., Suggests Whipple procedure with no cancer diagnosis)
+    "5B",  # Missed contraindication (e.g., Tetracycline for pregnant patient with Lyme disease)
+    "5C",  # Risk management lacking (e.g., No suicide plan for bipolar patient discussing self-harm)
+    "5D",  # Incorrect/invented procedural step (e.g., "Inject insulin topically" for glucose control)
+]
+
+
 class SafetyOutput(BaseAgentOutput):
     """
     Output model for Safety Guardian (Code-5).
@@ -171,18 +221,20 @@ class SafetyOutput(BaseAgentOutput):
     management, and incorrect procedural steps. Judges against
     mainstream guidelines up to ~2024.
     """
-    class SubCode(str, Enum):
-        """Sub-codes for safety issues."""
-        UNSAFE_TREATMENT = "5A"  # Unsafe/overly aggressive treatment (e.g., Suggests Whipple procedure with no cancer diagnosis)
-        CONTRAINDICATION = "5B"  # Missed contraindication (e.g., Tetracycline for pregnant patient with Lyme disease)
-        RISK_MANAGEMENT = "5C"  # Risk management lacking (e.g., No suicide plan for bipolar patient discussing self-harm)
-        HAZARDOUS_STEP = "5D"  # Incorrect/invented procedural step (e.g., "Inject insulin topically" for glucose control)
-    
-    classification: Union[Literal["0"], List[SubCode]] = Field(
+    classification: Union[Literal["0"], List[SafetyCode]] = Field(
         description="Classification codes for safety issues."
     )
 
 
+# Sub-codes for instruction issues (Code-6).
+InstructionCode = Literal[
+    "6A",  # Wrong language/format/length (e.g., Asked for Spanish bullet list, got English paragraph)
+    "6B",  # Template violation (e.g., Leaves "{DATE}" replaced with made-up date)
+    "6C",  # Ignores user constraints (e.g., Recommends expensive MRI after user notes financial limits)
+    "6D",  # Misinterpretation/disregard of scope (e.g., User wants short differential, LLM writes full pathophysiology essay)
+]
+
+
 class InstructionOutput(BaseAgentOutput):
     """
     Output model for Instruction Watcher (Code-6).
@@ -191,18 +243,19 @@ class InstructionOutput(BaseAgentOutput):
     instructions: language/format issues, template violations,
     ignored constraints, and scope misinterpretation.
     """
-    class SubCode(str, Enum):
-        """Sub-codes for instruction issues."""
-        LANGUAGE_FORMAT = "6A"  # Wrong language/format/length (e.g., Asked for Spanish bullet list, got English paragraph)
-        TEMPLATE = "6B"  # Template violation (e.g., Leaves "{DATE}" replaced with made-up date)
-        CONSTRAINT = "6C"  # Ignores user constraints (e.g., Recommends expensive MRI after user notes financial limits)
-        SCOPE = "6D"  # Misinterpretation/disregard of scope (e.g., User wants short differential, LLM writes full pathophysiology essay)
-    
-    classification: Union[Literal["0"], Literal["0.5"], List[SubCode]] = Field(
+    classification: Union[Literal["0", "0.5"], List[InstructionCode]] = Field(
         description="Classification codes for instruction issues."
     )
 
 
+# Sub-codes for hallucination issues (Code-7).
+HallucinationCode = Literal[
+    "7A",  # Synthetic HIPAA data (e.g., Invents real phone number or patient ID not provided)
+    "7B",  # Demographic/race bias (e.g., "Ethnicity alone dictates drug metabolism" with no evidence)
+    "7C",  # Other hallucination (e.g., Claims Kurt Cobain had asthma or references nonexistent condition)
+]
+
+
 class HallucinationOutput(BaseAgentOutput):
     """
     Output model for Hallucination Scout (Code-7).
@@ -211,13 +264,7 @@ class HallucinationOutput(BaseAgentOutput):
     demographic bias, synthetic data, and other hallucinations.
     Used only when the issue is not captured by other codes.
     """
-    class SubCode(str, Enum):
-        """Sub-codes for hallucination issues."""
-        PHI_LEAK = "7A"  # Synthetic HIPAA data (e.g., Invents real phone number or patient ID not provided)
-        DEMOGRAPHIC_BIAS = "7B"  # Demographic/race bias (e.g., "Ethnicity alone dictates drug metabolism" with no evidence)
-        OTHER = "7C"  # Other hallucination (e.g., Claims Kurt Cobain had asthma or references nonexistent condition)
-    
-    classification: Union[Literal["0"], Literal["0.5"], List[SubCode]] = Field(
+    classification: Union[Literal["0", "0.5"], List[HallucinationCode]] = Field(
         description="Classification codes for hallucination issues."
     )
 
@@ -225,7 +272,13 @@ class HallucinationOutput(BaseAgentOutput):
 class SubAgentDecision(BaseModel):
     """
     Model for tracking whether a sub-agent was called and why.
-    
+
+    Deliberately a pydantic model rather than a slots dataclass: it is part
+    of the OrchestratorOutput schema the agents SDK hands to the OpenAI
+    structured-output API, instances are built by pydantic-core when the
+    orchestrator response is parsed, and the frozen model backs the cached
+    root_digits scan below.
+
     Attributes:
         code: The code number of the sub-agent (1-7)
         called: Whether the agent was called (True) or not (False)
@@ -245,32 +298,46 @@ class SubAgentDecision(BaseModel):
         description="Reasoning from the agent's output (only if called)"
     )
 
-    @validator('code')
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
+    @field_validator('code', mode='after')
+    @classmethod
     def validate_code(cls, v: int) -> int:
         """Validate code is between 1 and 7."""
         if not 1 <= v <= 7:
             raise ValueError("Code must be between 1 and 7")
         return v
 
-    @validator('classification', 'cls_reasoning')
-    def validate_output_fields(cls, v: Optional[Union[ClassificationCode, str]], values: dict) -> Optional[Union[ClassificationCode, str]]:
+    @cached_property
+    def root_digits(self) -> int:
         """
-        Validate that output fields are only present when agent is called.
-        None values are allowed for uncalled agents.
+        Root digits of this decision's sub-codes (letter suffixes dropped)
+        as a 7-bit mask: bit i set means digit str(i + 1) is present. Only
+        seven root digits exist, so a bitmask replaces the set-of-strings
+        without losing anything; cached because the model is frozen, so
+        validate_merged_codes reuses one scan per instance.
         """
-        if v is not None and not values.get('called', False):
-            # Raise warning but keep the value
-            import warnings
-            warnings.warn(f"Non-None {cls.__name__} is set when agent is not called. The value will be kept but may be ignored in processing.")
-        return v
-
-    def __str__(self) -> str:
-        """String representation for printing."""
+        mask = 0
+        if isinstance(self.classification, list):
+            for code in self.classification:
+                ch = code[:1]
+                if "1" <= ch <= "7":
+                    mask |= 1 << (ord(ch) - 49)
+        return mask
+
+    @cached_property
+    def _rendered(self) -> str:
+        """Rendered form, cached: the model is frozen and gets printed and
+        logged several times per pipeline run."""
         base = f"Code {self.code}: {'Called' if self.called else 'Not called'} - {self.reasoning}"
         if self.classification is not None and self.cls_reasoning is not None:
             return f"{base}\n  Output: {self.classification} - {self.cls_reasoning}"
         return base
 
+    def __str__(self) -> str:
+        """String representation for printing."""
+        return self._rendered
+
 
 class OrchestratorOutput(BaseModel):
     """
@@ -290,86 +357,155 @@ class OrchestratorOutput(BaseModel):
         rationale: Concise summary of main issues found (≤30 words)
         agent_decisions: List of decisions about which agents were called and why
     """
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
     merged_codes: ClassificationCode = Field(
         description="Merged classification codes from all specialists."
     )
-    rationale: str = Field(
+    rationale: StrippedStr = Field(
         description="Concise summary of main issues found."
     )
     agent_decisions: List[SubAgentDecision] = Field(
         description="List of decisions about which agents were called and why"
     )
 
-    @validator('merged_codes')
-    def validate_merged_codes(cls, v: ClassificationCode, values: dict) -> ClassificationCode:
+    @field_validator('merged_codes', mode='after')
+    @classmethod
+    def validate_merged_codes(cls, v: ClassificationCode, info: ValidationInfo) -> ClassificationCode:
         """
         Validate that merged_codes follows the correct merging logic:
         1. If any agent returns sub-codes, should be comma-separated unique digits
         2. If no sub-codes but any agent returns "0.5", should be "0.5"
         3. Otherwise should be "0"
         """
-        if 'agent_decisions' not in values:
+        decisions = info.data.get('agent_decisions')
+        if decisions is None:
             return v  # Skip validation if agent_decisions not yet validated
-            
-        # Collect all classifications from called agents
-        sub_codes = set()
-        has_uncertain = False
-        
-        for decision in values['agent_decisions']:
-            if decision.called and decision.classification is not None:
-                if decision.classification == "0.5":
-                    has_uncertain = True
-                elif isinstance(decision.classification, list):
-                    # Extract root codes (drop letter suffixes)
-                    for code in decision.classification:
-                        if code[0].isdigit():
-                            sub_codes.add(code[0])
-        
-        # Validate against merging rules
+
+        # Branch on v first: the common "0"/"0.5" outcomes only need to
+        # prove the absence of sub-codes, so the full digit-set build and
+        # sorted() run only on the list branch.
+        if v == "0":
+            # Should be "0" only if no sub-codes and no uncertain
+            for decision in decisions:
+                if decision.called and decision.classification is not None:
+                    if decision.classification == "0.5":
+                        raise ValueError("merged_codes is '0' but some agent returned '0.5'")
+                    if decision.root_digits:
+                        raise ValueError("merged_codes is '0' but agents returned sub-codes")
+            return v
+
+        if v == "0.5":
+            # Should be "0.5" only if no sub-codes but has uncertain
+            has_uncertain = False
+            for decision in decisions:
+                if decision.called and decision.classification is not None:
+                    if decision.root_digits:
+                        raise ValueError("merged_codes is '0.5' but agents returned sub-codes")
+                    if decision.classification == "0.5":
+                        has_uncertain = True
+            if not has_uncertain:
+                raise ValueError("merged_codes is '0.5' but no agent returned '0.5'")
+            return v
+
         if isinstance(v, list):
             # Should be sorted unique digits if any sub-codes exist
-            if not sub_codes:
+            mask = 0
+            for decision in decisions:
+                if decision.called:
+                    mask |= decision.root_digits
+            if not mask:
                 raise ValueError("merged_codes is a list but no sub-codes were returned by agents")
-            expected = sorted(sub_codes)
+            # Walking the bits low-to-high yields the digits already sorted.
+            expected = [chr(49 + i) for i in range(7) if mask >> i & 1]
             if v != expected:
                 raise ValueError(f"merged_codes list {v} does not match expected sorted unique digits {expected}")
-        elif v == "0.5":
-            # Should be "0.5" only if no sub-codes but has uncertain
-            if sub_codes:
-                raise ValueError("merged_codes is '0.5' but agents returned sub-codes")
-            if not has_uncertain:
-                raise ValueError("merged_codes is '0.5' but no agent returned '0.5'")
-        elif v == "0":
-            # Should be "0" only if no sub-codes and no uncertain
-            if sub_codes:
-                raise ValueError("merged_codes is '0' but agents returned sub-codes")
-            if has_uncertain:
-                raise ValueError("merged_codes is '0' but some agent returned '0.5'")
-        else:
-            raise ValueError(f"Invalid merged_codes value: {v}")
-            
-        return v
+            return v
 
-    @validator('rationale')
-    def validate_rationale(cls, v: str) -> str:
-        """Remove word count validation for rationale."""
-        return v.strip()
+        raise ValueError(f"Invalid merged_codes value: {v}")
 
-    @validator('agent_decisions')
+    @field_validator('agent_decisions', mode='after')
+    @classmethod
     def validate_agent_decisions(cls, v: List[SubAgentDecision]) -> List[SubAgentDecision]:
         """Validate agent decisions."""
         if len(v) != 7:
             raise ValueError(f"Agent decisions must include exactly 7 entries (got {len(v)})")
-        # Check that all codes 1-7 are present exactly once
-        codes = {decision.code for decision in v}
-        if codes != set(range(1, 8)):
+        # Check that all codes 1-7 are present exactly once: accumulate a
+        # bitmask instead of allocating two sets per validation.
+        seen = 0
+        for decision in v:
+            bit = 1 << decision.code
+            if seen & bit:
+                raise ValueError("Agent decisions must include exactly one entry for each code 1-7")
+            seen |= bit
+        if seen != _REQUIRED_CODES_MASK:
             raise ValueError("Agent decisions must include exactly one entry for each code 1-7")
+        # Output fields on uncalled agents are kept but flagged once here,
+        # in a single pass, rather than per field on every decision.
+        for decision in v:
+            if not decision.called and (decision.classification is not None
+                                        or decision.cls_reasoning is not None):
+                warnings.warn(f"Non-None output is set on uncalled agent {decision.code}. "
+                              "The value will be kept but may be ignored in processing.")
         return v
 
-    def __str__(self) -> str:
-        """String representation for printing."""
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> "OrchestratorOutput":
+        """
+        Build an instance from data already validated elsewhere (e.g. by the
+        OpenAI structured-output schema), bypassing pydantic validation via
+        model_construct — including the per-entry validators on the seven
+        nested agent_decisions, which dominate construction cost here. Use
+        model_validate for anything crossing an API boundary.
+        """
+        decisions = [
+            d if isinstance(d, SubAgentDecision) else SubAgentDecision.model_construct(**d)
+            for d in data.get("agent_decisions", [])
+        ]
+        return cls.model_construct(
+            merged_codes=data["merged_codes"],
+            rationale=data["rationale"],
+            agent_decisions=decisions,
+        )
+
+    @cached_property
+    def _rendered(self) -> str:
+        """Rendered form, cached: the model is frozen and the seven-way
+        decision join gets printed and logged several times per row."""
         decisions_str = "\n".join(str(d) for d in self.agent_decisions)
         return f"""Classification: {self.merged_codes}
 Rationale: {self.rationale}
 Agent Decisions:
-{decisions_str}""" 
\ No newline at end of file
+{decisions_str}"""
+
+    def __str__(self) -> str:
+        """String representation for printing."""
+        return self._rendered
+
+    def __repr__(self) -> str:
+        """Cheap one-liner: logging frameworks repr() objects even when the
+        record is filtered, so avoid pydantic's all-fields rendering."""
+        return f"<OrchestratorOutput codes={self.merged_codes}>"
+
+
+@lru_cache(maxsize=None)
+def schema_for(cls: type) -> dict:
+    """
+    JSON schema for one of the output models, cached per class. The models
+    are fixed at import time, so the schema never changes; callers that
+    register tool/function schemas repeatedly should go through this rather
+    than cls.model_json_schema(), which rebuilds the schema graph on every
+    call.
+    """
+    return cls.model_json_schema()
+
+
+@lru_cache(maxsize=None)
+def adapter_for(cls: type) -> TypeAdapter:
+    """
+    Reusable TypeAdapter for one of the output models, cached per class.
+    adapter.validate_json parses straight into pydantic-core without the
+    per-call setup of cls.model_validate_json, which matters on hot paths
+    that revalidate cached or batched responses row after row.
+    """
+    return TypeAdapter(cls)
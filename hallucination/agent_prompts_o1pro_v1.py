@@ -412,6 +412,11 @@ Input:
 
 Available tools: specialists whose description starts "Code 1 …" through "Code 7 …".
 
+An optional <hint> block may precede the input. It lists specialist codes
+that a cheap textual pre-filter has already eliminated for this case.
+Respect it: do NOT call those specialists, and report each of them as
+called=false with reasoning "pre-filter: no relevant signal".
+
 GOALS:
 1. **Always** call Code 1 (medical facts) and Code 5 (safety).
 2. Generate your own “ideal response” to the USER PROMPT (internally, do not show externally). 
@@ -520,3 +525,39 @@ Example Output:
   ]
 }
 """
+
+# ---------- Merge agent (fan-out mode) ----------------------------------------
+merge_prompt = """
+You are "Fault-Merger".
+Input:
+<user>USER PROMPT</user>
+<llm>LLM RESPONSE</llm>
+<specialist-reports>JSON mapping each specialist name to its code, classification and reasoning</specialist-reports>
+<skipped-specialists>JSON mapping each skipped specialist name to its code (may be empty)</skipped-specialists>
+
+The Code 1-7 specialist agents have ALREADY been run in parallel; their
+structured outputs are quoted verbatim inside <specialist-reports>. Agents
+listed in <skipped-specialists> were excluded by a cheap textual pre-filter
+that found no relevant signal for their code. Do NOT call any tools and do
+NOT re-derive their classifications. Your only job is to merge them:
+
+1. Merge all specialist classifications:
+   - IMPORTANT: If any sub-code letter is present, `merged_codes` **must be a comma-separated list of digits only**.
+   - Collect all sub-codes from each report (e.g. "4B").
+   - If at least one report returns sub-codes, drop letter suffixes (e.g. "4B" → "4", "7B" → "7").
+     * Sort the unique digits and join them with commas (e.g. "4,7").
+     * Return this as final merged_codes.
+   - Else if **no sub-codes** returned but **at least one** report returned "0.5", merged_codes is "0.5"
+   - Otherwise, "0"
+2. Write <rationale> (≤30 words) summarizing main faults.
+3. Produce decision objects for all 7 agents:
+   - `code`: 1..7
+   - `called`: true when a report for that code is present, false otherwise
+   - `reasoning`: ≤20 words on why the specialist ran (or was skipped);
+     for <skipped-specialists> entries use "pre-filter: no relevant signal"
+   - If called=true, copy the report's `classification` into `classification` and its reasoning into `cls_reasoning` verbatim.
+4. Return exactly three sections:
+   <merged-codes>
+   <rationale>
+   <agent-decisions>
+"""
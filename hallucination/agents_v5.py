@@ -22,10 +22,17 @@ The pipeline supports:
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
 import argparse
 import logging
 import json
+import re
+from collections import defaultdict
+
+import numpy as np
+import orjson
 from pathlib import Path
 from typing import (
     List, Union, Literal, Optional, Dict, Any, Tuple,
@@ -33,9 +40,10 @@ from typing import (
 )
 from dataclasses import dataclass
 from enum import Enum
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
 from pydantic import BaseModel, Field, validator
-from agents import Agent, Runner, WebSearchTool, ModelSettings
+from agents import Agent, Runner, WebSearchTool, ModelSettings, set_default_openai_client
 from agent_prompts_o1pro_v1 import (
     medfact_prompt, medfact_description,
     citation_prompt, citation_description,
@@ -44,16 +52,14 @@ from agent_prompts_o1pro_v1 import (
     safety_prompt, safety_description,
     instruction_prompt, instruction_description,
     hallucination_prompt, hallucination_description,
-    orchestrator_prompt
+    orchestrator_prompt, merge_prompt
 )
 from agent_outputs_o1pro import (
     BaseAgentOutput, MedFactOutput, CitationOutput, ReasoningOutput,
     ContextOutput, SafetyOutput, InstructionOutput, HallucinationOutput,
-    OrchestratorOutput, ClassificationCode,
-    SPECIALIST_REASONING_MAX_WORDS, ORCHESTRATOR_RATIONALE_MAX_WORDS,
-    AGENT_DECISION_REASONING_MAX_WORDS
+    OrchestratorOutput, ClassificationCode, adapter_for, schema_for,
 )
-from collections import Counter
+from cache import cached_run
 
 # Type aliases for better readability
 AgentOutput = TypeVar('AgentOutput', bound='BaseAgentOutput')
@@ -117,87 +123,161 @@ def get_model_settings(model: str) -> ModelSettings:
     return ModelSettings(tool_choice="auto")
 
 
+# One entry per specialist: (name, code, prompt, tool_description, output_type, uses_search)
+SPECIALIST_SPECS = [
+    ("MedFactChecker", 1, medfact_prompt, medfact_description, MedFactOutput, True),
+    ("CitationVerifier", 2, citation_prompt, citation_description, CitationOutput, True),
+    ("ReasoningAuditor", 3, reasoning_prompt, reasoning_description, ReasoningOutput, False),
+    ("ContextKeeper", 4, context_prompt, context_description, ContextOutput, False),
+    ("SafetyGuardian", 5, safety_prompt, safety_description, SafetyOutput, False),
+    ("InstructionWatcher", 6, instruction_prompt, instruction_description, InstructionOutput, False),
+    ("HallucinationScout", 7, hallucination_prompt, hallucination_description, HallucinationOutput, False),
+]
+
+SPECIALIST_CODES = {name: code for name, code, *_ in SPECIALIST_SPECS}
+
+# ---------------------------------------------------------------------------
+# Cheap rule-based gating of specialists (compiled once at import).
+#
+# The triggers mirror the orchestrator prompt's own call-plan heuristics:
+# CitationVerifier only makes sense when the response carries checkable
+# citation markers, ReasoningAuditor when causal/quantitative language is
+# present, InstructionWatcher when the prompt contains explicit
+# language/format/constraint instructions. MedFactChecker and
+# SafetyGuardian are always called by orchestrator rule, HallucinationScout
+# is the mandated final sweep, and ContextKeeper needs a prompt-vs-response
+# comparison no regex can do — those four are never gated.
+# ---------------------------------------------------------------------------
+_CITATION_TRIGGER = re.compile(
+    r"\b(doi|pmid|et al\.?|fda|cdc|ema|who|nice)\b"
+    r"|\[\d+\]"
+    r"|https?://"
+    r"|\b(?:19|20)\d{2}\s*;\s*\d+",  # journal-style "2021;5:34-40" refs
+    re.IGNORECASE,
+)
+_REASONING_TRIGGER = re.compile(
+    r"\b(because|due to|therefore|thus|hence|consequently|as a result"
+    r"|leads? to|caused? by|risk of)\b"
+    r"|\d+(?:\.\d+)?\s*%",
+    re.IGNORECASE,
+)
+_INSTRUCTION_TRIGGER = re.compile(
+    r"\b(in \d+ words|words? or (?:less|fewer)|word limit|bullet|format"
+    r"|table|list|summari[sz]e|translate|in (?:german|spanish|french"
+    r"|italian|chinese|japanese)|language|do not|don'?t|must|only|exactly"
+    r"|at most|at least|step[- ]by[- ]step|concise|brief)\b",
+    re.IGNORECASE,
+)
+
+_ALWAYS_ON_SPECIALISTS = frozenset(
+    {"MedFactChecker", "ContextKeeper", "SafetyGuardian", "HallucinationScout"}
+)
+
+
+def preselect_specialists(prompt: str, response: str) -> set[str]:
+    """
+    Decide which specialists are worth an LLM call for this row.
+
+    Returns the subset of SPECIALIST_SPECS names whose textual triggers
+    fire; the gate itself is O(len(text)). Skipped specialists are
+    reported to the merge agent and emitted as called=False decisions,
+    saving their LLM round-trips entirely.
+    """
+    selected = set(_ALWAYS_ON_SPECIALISTS)
+    if _CITATION_TRIGGER.search(response):
+        selected.add("CitationVerifier")
+    if _REASONING_TRIGGER.search(response):
+        selected.add("ReasoningAuditor")
+    if _INSTRUCTION_TRIGGER.search(prompt):
+        selected.add("InstructionWatcher")
+    return selected
+
+
+def build_specialist_agents(sub_agent_model: str = DEFAULT_MODEL) -> List[Agent]:
+    """
+    Build the seven specialist agents as plain Agent objects (not tools),
+    so they can be run directly in parallel.
+
+    Args:
+        sub_agent_model: AI model to use for all specialists
+
+    Returns:
+        List[Agent]: One configured agent per SPECIALIST_SPECS entry
+
+    Raises:
+        ValueError: If model is not supported
+    """
+    return [
+        make_agent(name, prompt, output_type, uses_search=uses_search, model=sub_agent_model)
+        for name, _, prompt, _, output_type, uses_search in SPECIALIST_SPECS
+    ]
+
+
+def create_merge_agent(orchestrator_model: str = DEFAULT_MODEL) -> Agent:
+    """
+    Create the merge agent for the parallel fan-out mode.
+
+    It performs only the merge/rationale step of the orchestrator: the
+    specialists have already run, so its prompt carries no tool-dispatch
+    instructions and it makes exactly one LLM call per row.
+
+    Args:
+        orchestrator_model: AI model to use for the merge step
+
+    Returns:
+        Agent: Configured merge agent
+
+    Raises:
+        ValueError: If model is not supported
+    """
+    if orchestrator_model not in SUPPORTED_MODELS:
+        raise ValueError(f"Unsupported orchestrator model: {orchestrator_model}")
+
+    return Agent(
+        name="MedFact Merger",
+        instructions=merge_prompt.strip(),
+        model=orchestrator_model,
+        model_settings=get_model_settings(orchestrator_model),
+        output_type=OrchestratorOutput
+    )
+
+
 def create_orchestrator(
     orchestrator_model: str = DEFAULT_MODEL,
     sub_agent_model: str = DEFAULT_MODEL
 ) -> Agent:
     """
     Create and configure the orchestrator agent.
-    
+
+    This is the tool-dispatch variant in which the orchestrator calls the
+    specialists sequentially round-by-round; the parallel fan-out path
+    (build_specialist_agents + create_merge_agent) is faster for batch
+    runs and is what main() uses.
+
     Args:
         orchestrator_model: AI model to use for the orchestrator
         sub_agent_model: AI model to use for all sub-agents
-        
+
     Returns:
         Agent: Configured orchestrator agent
-        
+
     Raises:
         ValueError: If model is not supported
     """
     if orchestrator_model not in SUPPORTED_MODELS:
         raise ValueError(f"Unsupported orchestrator model: {orchestrator_model}")
-    if sub_agent_model not in SUPPORTED_MODELS:
-        raise ValueError(f"Unsupported sub-agent model: {sub_agent_model}")
-    
-    # Create specialist agents
-    agents = [
-        make_agent(
-            "MedFactChecker",
-            medfact_prompt,
-            medfact_description,
-            MedFactOutput,
-            uses_search=True,
-            model=sub_agent_model
-        ),
-        make_agent(
-            "CitationVerifier",
-            citation_prompt,
-            citation_description,
-            CitationOutput,
-            uses_search=True,
-            model=sub_agent_model
-        ),
-        make_agent(
-            "ReasoningAuditor",
-            reasoning_prompt,
-            reasoning_description,
-            ReasoningOutput,
-            model=sub_agent_model
-        ),
-        make_agent(
-            "ContextKeeper",
-            context_prompt,
-            context_description,
-            ContextOutput,
-            model=sub_agent_model
-        ),
-        make_agent(
-            "SafetyGuardian",
-            safety_prompt,
-            safety_description,
-            SafetyOutput,
-            model=sub_agent_model
-        ),
-        make_agent(
-            "InstructionWatcher",
-            instruction_prompt,
-            instruction_description,
-            InstructionOutput,
-            model=sub_agent_model
-        ),
-        make_agent(
-            "HallucinationScout",
-            hallucination_prompt,
-            hallucination_description,
-            HallucinationOutput,
-            model=sub_agent_model
-        )
+
+    # Create specialist agents, wrapped as tools for the orchestrator
+    agent_tools = [
+        make_agent(name, prompt, output_type, uses_search=uses_search, model=sub_agent_model)
+        .as_tool(tool_name=name, tool_description=description.strip())
+        for name, _, prompt, description, output_type, uses_search in SPECIALIST_SPECS
     ]
-    
+
     return Agent(
         name="MedFact Orchestrator",
         instructions=orchestrator_prompt.strip(),
-        tools=agents,
+        tools=agent_tools,
         model=orchestrator_model,
         model_settings=get_model_settings(orchestrator_model),
         output_type=OrchestratorOutput
@@ -227,25 +307,26 @@ def setup_logging(log_path: Path) -> None:
 def make_agent(
     name: str,
     prompt: str,
-    tool_description: str,
     output_type: type[BaseAgentOutput],
     uses_search: bool = False,
     model: str = DEFAULT_MODEL
 ) -> Agent:
     """
     Create a specialist agent with the given configuration.
-    
+
+    Returns the plain Agent; callers that want it as an orchestrator tool
+    wrap it with .as_tool(...) themselves.
+
     Args:
         name: Name of the agent
         prompt: System prompt for the agent
-        tool_description: Description of the agent's capabilities
         output_type: Pydantic model class for structured output
         uses_search: Whether the agent should have access to web search
         model: AI model to use (default: DEFAULT_MODEL)
-        
+
     Returns:
         Agent: Configured specialist agent
-        
+
     Raises:
         ValueError: If model is not supported
     """
@@ -278,12 +359,24 @@ def make_agent(
         tools=[search_tool] if search_tool else [],
         model_settings=model_settings,
         output_type=output_type,
-    ).as_tool(
-        tool_name=name,
-        tool_description=tool_description.strip(),
     )
 
 
+def _compose_output(row: dict, output: OrchestratorOutput) -> dict:
+    """Build the output dict for one row: all input fields plus orchestrator output fields."""
+    # One model_dump replaces the per-decision attribute dance; with
+    # exclude_none the uncalled decisions drop their classification /
+    # cls_reasoning fields exactly as the old conditional dicts did.
+    dumped = output.model_dump(exclude_none=True)
+    out = dict(row)
+    out.update({
+        "merged_codes": dumped.get("merged_codes"),
+        "rationale": dumped.get("rationale"),
+        "agent_decisions": dumped.get("agent_decisions", []),
+    })
+    return out
+
+
 def process_row_json(row: dict, orchestrator: Agent) -> dict:
     """
     Process a single input dict through the orchestrator, return output dict (including input fields).
@@ -292,38 +385,287 @@ def process_row_json(row: dict, orchestrator: Agent) -> dict:
     prompt = row.get("Prompt", row.get("prompt", ""))
     response = row.get("Response", row.get("response", ""))
     row_idx = row.get("row_idx", "unknown")
-    
+
     try:
         payload = f"<user>{prompt.strip()}</user>\n<llm>{response}</llm>"
+        # Partial evaluation of the generic prompt: telling the
+        # orchestrator up front which codes the pre-filter eliminated
+        # saves it those tool calls and shortens its deliberation.
+        selected = preselect_specialists(prompt, response)
+        skipped_codes = sorted(
+            code for name, code in SPECIALIST_CODES.items() if name not in selected
+        )
+        if skipped_codes:
+            payload = (
+                f"<hint>Pre-filter eliminated codes: {skipped_codes}. "
+                f"Do not call those specialists.</hint>\n{payload}"
+            )
         result = Runner.run_sync(orchestrator, payload)
         output = result.final_output
         pred_cls, reasoning = parse_response(output)
-        
+
         # Print detailed output including agent decisions
         print(f"\nProcessing row {row_idx}:")
         print(str(output))
         print("-" * 80)
-        
-        # Compose output dict: include all input fields, plus orchestrator output fields
-        out = dict(row)
-        out.update({
-            "merged_codes": getattr(output, "merged_codes", None),
-            "rationale": getattr(output, "rationale", None),
-            "agent_decisions": [
-                {
-                    "code": d.code,
-                    "called": d.called,
-                    "reasoning": d.reasoning,
-                    **({"classification": d.classification, "cls_reasoning": d.cls_reasoning} if d.called else {})
-                } for d in getattr(output, "agent_decisions", [])
-            ]
-        })
-        return out
+
+        return _compose_output(row, output)
     except Exception as e:
         # Log and skip this row
         raise RuntimeError(f"Failed to process input: {e}")
 
 
+async def process_row_async(
+    row: dict,
+    specialists: List[Agent],
+    merge_agent: Agent
+) -> dict:
+    """
+    Async fan-out counterpart of process_row_json: all specialist agents
+    run concurrently via asyncio.gather, then their structured outputs are
+    handed to the merge agent for the merge/rationale step. Per-row
+    wall-clock drops from the sum of sub-agent latencies (plus
+    orchestrator round-trips) to the slowest specialist plus one merge
+    call, since the seven classifications are independent of each other.
+    """
+    prompt = row.get("Prompt", row.get("prompt", ""))
+    response = row.get("Response", row.get("response", ""))
+    row_idx = row.get("row_idx", "unknown")
+
+    try:
+        payload = f"<user>{prompt.strip()}</user>\n<llm>{response}</llm>"
+        selected = preselect_specialists(prompt, response)
+        active = [agent for agent in specialists if agent.name in selected]
+        skipped = {
+            agent.name: SPECIALIST_CODES[agent.name]
+            for agent in specialists if agent.name not in selected
+        }
+        # cached_run consults the content-hash disk cache (DAS_CACHE=1)
+        # before touching the API, so repeat evals skip both waves.
+        outputs = await asyncio.gather(
+            *(cached_run(agent, payload) for agent in active)
+        )
+
+        reports = {
+            agent.name: {
+                "code": SPECIALIST_CODES[agent.name],
+                "classification": spec_output.classification,
+                "reasoning": spec_output.reasoning,
+            }
+            for agent, spec_output in zip(active, outputs)
+        }
+        output = await cached_run(
+            merge_agent, _merge_payload(payload, reports, skipped)
+        )
+        pred_cls, reasoning = parse_response(output)
+
+        print(f"\nProcessing row {row_idx}:")
+        print(str(output))
+        print("-" * 80)
+
+        return _compose_output(row, output)
+    except Exception as e:
+        raise RuntimeError(f"Failed to process input: {e}")
+
+
+def _pair_digest(prompt: str, response: str) -> bytes:
+    """Dedup key for one (prompt, response) pair."""
+    return hashlib.blake2b(
+        f"{prompt}\x00{response}".encode(), digest_size=16
+    ).digest()
+
+
+def _merge_payload(payload: str, reports: dict, skipped: dict) -> str:
+    """Build the merge agent input from specialist reports and skipped codes."""
+    return (
+        f"{payload}\n<specialist-reports>"
+        f"{json.dumps(reports, ensure_ascii=False)}</specialist-reports>"
+        f"\n<skipped-specialists>"
+        f"{json.dumps(skipped, ensure_ascii=False)}</skipped-specialists>"
+    )
+
+
+def _json_schema_format(output_type: type[BaseModel]) -> dict:
+    """Chat Completions response_format dict for a structured-output model."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": output_type.__name__,
+            "schema": schema_for(output_type),
+            "strict": False,
+        },
+    }
+
+
+def run_offline_batch(
+    pending: List[Tuple[Any, dict]],
+    args,
+    writer: Callable[[dict], None]
+) -> List[dict]:
+    """
+    Process the pending rows through the OpenAI Batch API (50% price,
+    24h completion window) instead of interactive requests: one batch
+    wave for all selected specialist calls, one wave for the merge step.
+
+    Suitable for offline evals with no latency constraint. Web search is
+    unsupported in Batch; in the current configuration no specialist
+    actually carries a WebSearchTool (the search-capable agents run on
+    SEARCH_AGENT_MODEL, for which make_agent skips the tool), so every
+    call is batchable.
+    """
+    from agent_tools.batch_runner import BatchBuilder
+
+    # -------- wave 1: all selected specialist calls ------------------
+    builder = BatchBuilder(model=args.sub_agent_model, temperature=0)
+    payloads: Dict[Any, str] = {}
+    selections: Dict[Any, set] = {}
+    for key, row in pending:
+        prompt = row.get("Prompt", row.get("prompt", ""))
+        response = row.get("Response", row.get("response", ""))
+        payloads[key] = f"<user>{prompt.strip()}</user>\n<llm>{response}</llm>"
+        selections[key] = preselect_specialists(prompt, response)
+        for name, _, spec_prompt, _, output_type, uses_search in SPECIALIST_SPECS:
+            if name not in selections[key]:
+                continue
+            builder.add(
+                custom_id=f"{key}|{name}",
+                user_msg=payloads[key],
+                system_msg=spec_prompt.strip(),
+                model=SEARCH_AGENT_MODEL if uses_search else args.sub_agent_model,
+                response_format=_json_schema_format(output_type),
+            )
+    logging.info(f"Submitting specialist batch ({len(builder)} requests)")
+    specialist_raw = builder.flush()
+
+    # -------- wave 2: merge step per row -----------------------------
+    merge_builder = BatchBuilder(model=args.orchestrator_model, temperature=0)
+    merge_rows: List[Tuple[Any, dict]] = []
+    for key, row in pending:
+        reports = {}
+        failed = None
+        for name, code, _, _, output_type, _ in SPECIALIST_SPECS:
+            if name not in selections[key]:
+                continue
+            raw = specialist_raw.get(f"{key}|{name}")
+            if raw is None:
+                failed = f"no batch response from {name}"
+                break
+            try:
+                out = adapter_for(output_type).validate_json(raw)
+            except Exception as e:
+                failed = f"unparseable {name} output: {e}"
+                break
+            reports[name] = {
+                "code": code,
+                "classification": out.classification,
+                "reasoning": out.reasoning,
+            }
+        if failed:
+            logging.error(f"Error processing input (row_idx: {key}): {failed}")
+            continue
+        skipped = {
+            name: code for name, code, *_ in SPECIALIST_SPECS
+            if name not in selections[key]
+        }
+        merge_builder.add(
+            custom_id=f"{key}|merge",
+            user_msg=_merge_payload(payloads[key], reports, skipped),
+            system_msg=merge_prompt.strip(),
+            response_format=_json_schema_format(OrchestratorOutput),
+        )
+        merge_rows.append((key, row))
+    logging.info(f"Submitting merge batch ({len(merge_builder)} requests)")
+    merge_raw = merge_builder.flush()
+
+    # -------- collect ------------------------------------------------
+    outputs = []
+    for key, row in merge_rows:
+        raw = merge_raw.get(f"{key}|merge")
+        if raw is None:
+            logging.error(f"Error processing input (row_idx: {key}): no merge response")
+            continue
+        try:
+            output = adapter_for(OrchestratorOutput).validate_json(raw)
+        except Exception as e:
+            logging.error(f"Error processing input (row_idx: {key}): unparseable merge output: {e}")
+            continue
+        out = _compose_output(row, output)
+        writer(out)
+        outputs.append(out)
+        _log_row_output(key, out)
+    return outputs
+
+
+async def _process_rows_async(
+    pending: List[Tuple[Any, dict]],
+    specialists: List[Agent],
+    merge_agent: Agent,
+    max_concurrency: int,
+    writer: Callable[[dict], None]
+) -> List[dict]:
+    """
+    Dispatch all pending (key, row) pairs concurrently, bounded by a
+    semaphore so at most `max_concurrency` rows are in flight at once
+    (each row fans out to its specialists internally). Each finished row
+    is handed to `writer` immediately, so results survive a crash.
+    Failures are logged per row and do not abort the batch.
+
+    All agent runs share one AsyncOpenAI client on a pooled httpx
+    transport, so concurrent specialist calls reuse warm keep-alive
+    connections instead of paying a TLS/TCP handshake per request.
+    Retry/timeout behaviour can additionally be tuned via the standard
+    OPENAI_MAX_RETRIES / OPENAI_TIMEOUT environment variables.
+    """
+    shared_http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=256, max_keepalive_connections=128),
+        timeout=httpx.Timeout(120.0),
+    )
+    set_default_openai_client(AsyncOpenAI(http_client=shared_http))
+
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def bounded(key: Any, row: dict) -> dict:
+        async with sem:
+            out = await process_row_async(row, specialists, merge_agent)
+        writer(out)
+        _log_row_output(key, out)
+        return out
+
+    try:
+        results = await asyncio.gather(
+            *(bounded(key, row) for key, row in pending),
+            return_exceptions=True
+        )
+    finally:
+        await shared_http.aclose()
+
+    outputs = []
+    for (key, _), res in zip(pending, results):
+        if isinstance(res, BaseException):
+            logging.error(f"Error processing input (row_idx: {key}): {res}")
+            continue
+        outputs.append(res)
+    return outputs
+
+
+def _log_row_output(key: Any, out: dict) -> None:
+    """Log the detailed processing output for one finished row."""
+    logging.info(f"Processing row (row_idx: {key}):")
+    logging.info(f"  Classification: {out.get('merged_codes', 'N/A')}")
+    logging.info(f"  Rationale: {out.get('rationale', 'N/A')}")
+    logging.info(f"  Agent Decisions:")
+    for decision in out.get('agent_decisions', []):
+        code = decision.get('code', 'N/A')
+        called = decision.get('called', False)
+        reasoning = decision.get('reasoning', 'N/A')
+        logging.info(f"    Code {code}: {'Called' if called else 'Not called'} - {reasoning}")
+        if called:
+            classification = decision.get('classification', 'N/A')
+            cls_reasoning = decision.get('cls_reasoning', 'N/A')
+            logging.info(f"      Output: {classification} - {cls_reasoning}")
+    logging.info(f"Processed input (row_idx: {key})")
+
+
 def main() -> None:
     """Main entry point for the medical fact checking pipeline (JSON-only mode)."""
     parser = argparse.ArgumentParser(
@@ -355,20 +697,38 @@ def main() -> None:
     parser.add_argument(
         "--start-idx",
         type=int,
-        required=True,
+        default=None,
         help="Starting row index to process (inclusive)"
     )
     parser.add_argument(
         "--end-idx",
         type=int,
-        required=True,
+        default=None,
         help="Ending row index to process (inclusive)"
     )
+    parser.add_argument(
+        "--finalize",
+        action="store_true",
+        help="Skip processing: consolidate the streamed .ndjson results "
+             "into the output JSON array and print stats"
+    )
     parser.add_argument(
         "--ignore-exist",
         action="store_true",
         help="Ignore existing results and overwrite them with new results"
     )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of rows processed concurrently"
+    )
+    parser.add_argument(
+        "--offline-batch",
+        action="store_true",
+        help="Submit all LLM calls through the OpenAI Batch API "
+             "(half price, up to 24h) instead of interactive requests"
+    )
     parser.add_argument(
         "--log",
         default="pipeline.log",
@@ -377,12 +737,24 @@ def main() -> None:
 
     args = parser.parse_args()
 
+    output_path = Path(args.output_json)
+    ndjson_path = output_path.with_suffix(".ndjson")
+
+    # Finalize-only invocation: coalesce the stream, no processing
+    if args.finalize:
+        _finalize_output(output_path, ndjson_path)
+        print_response_quality_stats(output_path)
+        return
+    if args.start_idx is None or args.end_idx is None:
+        parser.error("--start-idx and --end-idx are required unless --finalize")
+
     # Setup logging
     setup_logging(Path(args.log))
 
-    # Load input JSON
-    with open(args.input_json, "r", encoding="utf-8") as f:
-        json_data = json.load(f)
+    # Load input JSON (orjson parses large nested inputs several times
+    # faster than stdlib json)
+    with open(args.input_json, "rb") as f:
+        json_data = orjson.loads(f.read())
     if isinstance(json_data, dict) and "results" in json_data:
         input_rows = json_data["results"]
     elif isinstance(json_data, list):
@@ -390,123 +762,179 @@ def main() -> None:
     else:
         raise ValueError("Unrecognized JSON format for input.")
 
-    # Load existing output JSON if present
-    output_path = Path(args.output_json)
+    # Collect already-processed keys: a streaming scan of the NDJSON log
+    # (row_idx only), plus any legacy consolidated JSON output. No full
+    # result list is materialized — finished rows live on disk.
+    existing_keys = set()
     if output_path.exists():
-        with open(output_path, "r", encoding="utf-8") as f:
-            existing_outputs = json.load(f)
-        # Build set of unique keys for fast lookup
-        existing_keys = {row.get("row_idx"): row for row in existing_outputs}
-    else:
-        existing_outputs = []
-        existing_keys = {}
+        with open(output_path, "rb") as f:
+            existing_keys.update(row.get("row_idx") for row in orjson.loads(f.read()))
+    if ndjson_path.exists():
+        with open(ndjson_path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    existing_keys.add(orjson.loads(line).get("row_idx"))
 
     # Only process the specified range
     start_idx = args.start_idx
     end_idx = args.end_idx
     input_rows = input_rows[start_idx:end_idx+1]
 
-    # Create orchestrator
-    orchestrator = create_orchestrator(
-        orchestrator_model=args.orchestrator_model,
-        sub_agent_model=args.sub_agent_model
-    )
+    # Create the parallel fan-out agents: the specialists run directly,
+    # the merge agent performs only the merge/rationale step.
+    specialists = build_specialist_agents(args.sub_agent_model)
+    merge_agent = create_merge_agent(args.orchestrator_model)
 
-    # Process all input rows
-    new_outputs = []
+    # Collect the rows that still need processing, then dispatch them all
+    # concurrently: every row is independent network I/O, so wall-clock
+    # drops from the sum of per-row latencies to roughly the slowest row
+    # per window of --max-concurrency.
+    pending = []
     for i, row in enumerate(input_rows, start=start_idx):
         key = row.get("row_idx", i)
         if not args.ignore_exist and key in existing_keys:
             logging.info(f"Skipping already processed input (row_idx: {key})")
             continue
-        try:
-            out = process_row_json(row, orchestrator)
-            new_outputs.append(out)
-            
-            # Log detailed processing output
-            logging.info(f"Processing row {i}:")
-            logging.info(f"  Classification: {out.get('merged_codes', 'N/A')}")
-            logging.info(f"  Rationale: {out.get('rationale', 'N/A')}")
-            logging.info(f"  Agent Decisions:")
-            for decision in out.get('agent_decisions', []):
-                code = decision.get('code', 'N/A')
-                called = decision.get('called', False)
-                reasoning = decision.get('reasoning', 'N/A')
-                logging.info(f"    Code {code}: {'Called' if called else 'Not called'} - {reasoning}")
-                if called:
-                    classification = decision.get('classification', 'N/A')
-                    cls_reasoning = decision.get('cls_reasoning', 'N/A')
-                    logging.info(f"      Output: {classification} - {cls_reasoning}")
-            
-            logging.info(f"Processed input (row_idx: {key})")
-        except Exception as e:
-            logging.error(f"Error processing input (row_idx: {key}): {e}")
+        pending.append((key, row))
+
+    # Eval datasets often repeat the same (prompt, response) pair across
+    # rows; one orchestration per unique pair suffices, with its result
+    # fanned back to every duplicate row at zero accuracy cost.
+    groups: Dict[bytes, List[Tuple[Any, dict]]] = defaultdict(list)
+    for key, row in pending:
+        prompt = row.get("Prompt", row.get("prompt", ""))
+        response = row.get("Response", row.get("response", ""))
+        groups[_pair_digest(prompt, response)].append((key, row))
+    representatives = [members[0] for members in groups.values()]
+    if len(representatives) < len(pending):
+        logging.info(
+            f"Deduplicated {len(pending)} pending rows into "
+            f"{len(representatives)} unique (prompt, response) pairs"
+        )
 
-    # Merge new outputs with existing (overwrite if ignore_exist)
-    if args.ignore_exist:
-        # Remove any existing outputs with the same key as new outputs
-        new_keys = {row.get("row_idx") for row in new_outputs}
-        merged_outputs = [row for row in existing_outputs if row.get("row_idx") not in new_keys] + new_outputs
-    else:
-        merged_outputs = existing_outputs + new_outputs
+    # Stream each finished row to the NDJSON log as it completes: O(1)
+    # per row, and a crash loses at most the rows still in flight.
+    written = 0
+    ndjson_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(ndjson_path, "ab") as out_f:
+        def writer(out: dict) -> None:
+            # Clone the representative's result into every row of its
+            # duplicate group, keeping each row's own input fields.
+            # orjson emits UTF-8 bytes directly, several times faster
+            # than stdlib json; flush per group keeps the log crash-safe.
+            nonlocal written
+            prompt = out.get("Prompt", out.get("prompt", ""))
+            response = out.get("Response", out.get("response", ""))
+            for _, member_row in groups[_pair_digest(prompt, response)]:
+                clone = dict(member_row)
+                clone.update({
+                    "merged_codes": out.get("merged_codes"),
+                    "rationale": out.get("rationale"),
+                    "agent_decisions": out.get("agent_decisions"),
+                })
+                out_f.write(orjson.dumps(clone) + b"\n")
+                written += 1
+            out_f.flush()
+
+        if args.offline_batch:
+            new_outputs = run_offline_batch(representatives, args, writer)
+        else:
+            new_outputs = asyncio.run(
+                _process_rows_async(
+                    representatives, specialists, merge_agent,
+                    args.max_concurrency, writer
+                )
+            )
+
+    logging.info(f"Appended {written} results to {ndjson_path}")
+    logging.info(f"Run with --finalize to consolidate into {output_path}")
+
+    # Print response quality stats over everything streamed so far
+    if ndjson_path.exists():
+        print_response_quality_stats(ndjson_path)
+
+
+def _finalize_output(output_path: Path, ndjson_path: Path) -> None:
+    """
+    Compile the streamed NDJSON log (plus any legacy JSON array output)
+    into the consolidated JSON array at output_path. Later records win
+    on duplicate row_idx, so re-runs with --ignore-exist overwrite their
+    predecessors just as the old in-memory merge did.
+    """
+    merged: Dict[Any, dict] = {}
+    if output_path.exists():
+        with open(output_path, "rb") as f:
+            for row in orjson.loads(f.read()):
+                merged[row.get("row_idx")] = row
+    if ndjson_path.exists():
+        with open(ndjson_path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    row = orjson.loads(line)
+                    merged[row.get("row_idx")] = row
 
-    # Ensure output directory exists
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    # Save output JSON
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(merged_outputs, f, indent=2, ensure_ascii=False)
-    logging.info(f"Saved {len(merged_outputs)} results to {output_path}")
-
-    # Print response quality stats
-    print_response_quality_stats(output_path)
+    with open(output_path, "wb") as f:
+        f.write(orjson.dumps(list(merged.values()), option=orjson.OPT_INDENT_2))
+    print(f"Consolidated {len(merged)} results into {output_path}")
 
 
 def print_response_quality_stats(output_json_path: Path):
-    """Print statistics about the response quality from the JSON output file."""
-    with open(output_json_path, "r", encoding="utf-8") as f:
-        results = json.load(f)
+    """Print statistics about the response quality from the JSON (or streamed NDJSON) output file."""
+    if output_json_path.suffix == ".ndjson":
+        with open(output_json_path, "rb") as f:
+            results = [orjson.loads(line) for line in f if line.strip()]
+    else:
+        with open(output_json_path, "rb") as f:
+            results = orjson.loads(f.read())
     total = len(results)
     if total == 0:
         print("No results to analyze.")
         return
     
-    # Extract ground truth and predictions
-    ground_truth = []
-    predictions = []
-    
-    for r in results:
+    # Extract ground truth and predictions into aligned NumPy arrays once;
+    # the confusion matrix then falls out of four vectorized boolean ops
+    # instead of four Python-level passes over the result list.
+    def _gt_value(r):
         # Get ground truth from Hallucination/Accuracy field
         gt = r.get("Hallucination/Accuracy", None)
         if isinstance(gt, str):
             gt = float(gt) if gt.replace('.', '').isdigit() else 0
-        ground_truth.append(gt)
-        
+        return 0.0 if gt is None else float(gt)
+
+    def _pred_value(r):
         # Get prediction from merged_codes
         merged_codes = r.get("merged_codes", "0")
         if isinstance(merged_codes, list):
             merged_codes = merged_codes[0] if merged_codes else "0"
         # Convert to binary: 0 = no problem, anything else = problem
-        pred = 0 if merged_codes == "0" else 1
-        predictions.append(pred)
-    
+        return 0 if merged_codes == "0" else 1
+
+    # float64 keeps "0.5" ground-truth labels out of both the positive
+    # and negative bucket, exactly as the old per-element comparisons did.
+    ground_truth = np.fromiter((_gt_value(r) for r in results), dtype=np.float64, count=total)
+    predictions = np.fromiter((_pred_value(r) for r in results), dtype=np.int8, count=total)
+
     # Calculate confusion matrix
-    true_positives = sum(1 for gt, pred in zip(ground_truth, predictions) if gt == 1 and pred == 1)
-    false_positives = sum(1 for gt, pred in zip(ground_truth, predictions) if gt == 0 and pred == 1)
-    true_negatives = sum(1 for gt, pred in zip(ground_truth, predictions) if gt == 0 and pred == 0)
-    false_negatives = sum(1 for gt, pred in zip(ground_truth, predictions) if gt == 1 and pred == 0)
-    
+    gt_pos, gt_neg = ground_truth == 1, ground_truth == 0
+    pred_pos = predictions == 1
+    true_positives = int((gt_pos & pred_pos).sum())
+    false_positives = int((gt_neg & pred_pos).sum())
+    true_negatives = int((gt_neg & ~pred_pos).sum())
+    false_negatives = int((gt_pos & ~pred_pos).sum())
+
     # Calculate metrics
     accuracy = (true_positives + true_negatives) / total if total > 0 else 0
     precision = true_positives / (true_positives + false_positives) if (true_positives + false_positives) > 0 else 0
     recall = true_positives / (true_positives + false_negatives) if (true_positives + false_negatives) > 0 else 0
     f1_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-    
+
     print(f"\n=== Classification Statistics ===")
     print(f"Total responses: {total}")
-    print(f"Ground truth positives: {sum(ground_truth)}")
-    print(f"Ground truth negatives: {total - sum(ground_truth)}")
-    print(f"Predicted positives: {sum(predictions)}")
-    print(f"Predicted negatives: {total - sum(predictions)}")
+    print(f"Ground truth positives: {ground_truth.sum():g}")
+    print(f"Ground truth negatives: {total - ground_truth.sum():g}")
+    print(f"Predicted positives: {int(predictions.sum())}")
+    print(f"Predicted negatives: {total - int(predictions.sum())}")
     
     print(f"\nConfusion Matrix:")
     print(f"True Positives:  {true_positives}")
@@ -529,30 +957,34 @@ def print_response_quality_stats(output_json_path: Path):
     print(f"\n=== Response Quality Metrics ===")
     print(f"Responses detected with any problem: {responses_with_problem} ({responses_with_problem/total*100:.2f}%)")
     
-    # Per-code stats
-    code_counter = Counter()
+    # Per-code stats: collect the root digits once, then let np.bincount
+    # do the tallying instead of a Counter increment per code.
+    root_code_strs = {str(i) for i in range(1, 8)}
+    code_ints = []
     for r in results:
         codes = r.get("merged_codes", [])
         if isinstance(codes, str):
             codes = codes.split(",") if codes else []
         for code in set(codes):
-            if code in {str(i) for i in range(1,8)}:
-                code_counter[code] += 1
+            if code in root_code_strs:
+                code_ints.append(int(code))
+    code_counts = np.bincount(np.asarray(code_ints, dtype=np.int64), minlength=8)
     print("\nSub-Code Problem Detection Percentage:")
     for code in range(1,8):
-        count = code_counter[str(code)]
+        count = int(code_counts[code])
         percent = count / total * 100
         print(f"  Code-{code}: {count} responses ({percent:.2f}%)")
-    
+
     # Agent call distribution
-    agent_calls = Counter()
-    for r in results:
-        for d in r.get("agent_decisions", []):
-            if d.get("called"):
-                agent_calls[str(d.get("code"))] += 1
+    call_ints = [
+        d.get("code") for r in results
+        for d in r.get("agent_decisions", [])
+        if d.get("called") and isinstance(d.get("code"), int)
+    ]
+    call_counts = np.bincount(np.asarray(call_ints, dtype=np.int64), minlength=8)
     print("\nAgent Call Distribution:")
     for code in range(1,8):
-        calls = agent_calls[str(code)]
+        calls = int(call_counts[code])
         call_rate = calls / total * 100
         print(f"  Agent {code}: {calls} calls ({call_rate:.1f}%)")
 
@@ -0,0 +1,70 @@
+"""
+Content-addressed disk cache for agent runs.
+
+Re-runs over overlapping datasets (or identical prompts across rows)
+repeatedly pay for the same orchestration LLM calls. cached_run keys each
+run by a blake2b hash of (agent name, model, instructions, payload) and
+stores the structured output JSON under .agent_cache/<xx>/<digest>.json,
+so a repeat eval reconstructs the pydantic model from disk instead of
+hitting the API.
+
+Like the LLM response cache in agent_tools.utils, this is opt-in via
+DAS_CACHE=1 so exploratory runs that want fresh samples are unaffected.
+The cache directory can be moved with DAS_AGENT_CACHE_DIR.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from agents import Agent, Runner
+
+from agent_outputs_o1pro import adapter_for
+
+CACHE_DIR = Path(os.getenv("DAS_AGENT_CACHE_DIR", ".agent_cache"))
+
+
+def _cache_enabled() -> bool:
+    return os.getenv("DAS_CACHE") == "1"
+
+
+def _cache_path(agent: Agent, payload: str) -> Path:
+    """Shard by the first two hex digits so no directory grows unbounded."""
+    key = hashlib.blake2b(
+        f"{agent.name}\x00{agent.model}\x00{agent.instructions}\x00{payload}".encode(),
+        digest_size=16,
+    ).hexdigest()
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+async def cached_run(agent: Agent, payload: str):
+    """
+    Await Runner.run(agent, payload), returning the structured final
+    output, with an optional disk cache in front of the API call.
+
+    On a hit the output model is revalidated from the stored JSON; on a
+    miss the run result is written atomically (tempfile + os.replace) so
+    a crash can never leave a truncated cache entry behind.
+    """
+    if not _cache_enabled() or agent.output_type is None:
+        result = await Runner.run(agent, payload)
+        return result.final_output
+
+    path = _cache_path(agent, payload)
+    if path.exists():
+        # The shared per-class TypeAdapter skips the per-call setup of
+        # model_validate_json on repeat-heavy cache-hit runs.
+        return adapter_for(agent.output_type).validate_json(
+            path.read_text(encoding="utf-8")
+        )
+
+    result = await Runner.run(agent, payload)
+    output = result.final_output
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(output.model_dump_json())
+    os.replace(tmp, path)
+    return output
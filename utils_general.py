@@ -1,4 +1,6 @@
+import atexit
 import json,os,math
+import orjson
 import pandas as pd
 import re
 from collections import Counter
@@ -7,6 +9,11 @@ from typing import List, Dict, Optional, Literal
 from pathlib import Path
 
 
+# One option line: "A: text" (letter case-insensitive), anchored per line so
+# the whole block can be scanned in a single C-level pass.
+_OPTION_LINE_RE = re.compile(r"^\s*([A-Za-z]):\s*(.*)$", re.MULTILINE)
+
+
 def get_full_choice_text_from_question_block(
     model_letter_choice: str,
     question_block_text: str
@@ -39,15 +46,10 @@ def get_full_choice_text_from_question_block(
     if not letter_choice.isalpha() or len(letter_choice) != 1:
         return None
 
-    lines = question_block_text.splitlines()
-    for line in lines:
-        line = line.strip()
-        match = re.match(r"^\s*([A-Z]):\s*(.*)", line, re.IGNORECASE) # Make letter matching case-insensitive
-        if match:
-            option_letter = match.group(1).upper() # Ensure letter is uppercase for comparison
-            option_text = match.group(2)
-            if option_letter == letter_choice:
-                return f"{match.group(1)}: {option_text}"
+    # Single multiline scan instead of splitlines + a regex match per line.
+    for match in _OPTION_LINE_RE.finditer(question_block_text):
+        if match.group(1).upper() == letter_choice:
+            return f"{match.group(1)}: {match.group(2).rstrip()}"
 
     return None
 
@@ -91,7 +93,16 @@ def load_subjects(
         One dictionary per selected row.
     """
     # -------- load only the requested sheet & columns ----------------
-    df = pd.read_excel(file_path, sheet_name=sheet, usecols=keys)
+    read_kwargs = dict(sheet_name=sheet, usecols=keys, dtype="string")
+    if loading_type == "sequential" and n_subjects is not None and n_subjects > -1:
+        # Stop the reader at the last needed row instead of pulling the
+        # whole sheet. ("random" sampling still needs every row.)
+        read_kwargs["nrows"] = start_row + n_subjects
+    try:
+        # python-calamine parses xlsx ~5x faster than openpyxl.
+        df = pd.read_excel(file_path, engine="calamine", **read_kwargs)
+    except ImportError:
+        df = pd.read_excel(file_path, **read_kwargs)
 
     # -------- branch on loading strategy ----------------------------
     if n_subjects is not None and n_subjects > -1:
@@ -236,20 +247,79 @@ def majority_vote(responses):
     return ",".join(result)
 
 
+class JsonRecordWriter:
+    """
+    Long-lived buffered writer for the JSON-array logs that
+    append_json_record produces. One file handle stays open for the whole
+    run and is flushed every `flush_every` records, instead of an
+    open/truncate/write/close cycle per record (thousands of syscall
+    triples on a long sweep, worse on NFS). The on-disk format is
+    identical, so existing readers keep working, and close() is
+    registered with atexit so an interrupt still lands a valid file.
+    """
+
+    def __init__(self, file_path, flush_every=32):
+        self.file_path = file_path
+        self.flush_every = flush_every
+        self._fh = None
+        self._first = True
+        self._count = 0
+        atexit.register(self.close)
+
+    def _ensure_open(self):
+        if self._fh is not None:
+            return
+        if os.path.exists(self.file_path) and os.path.getsize(self.file_path) >= 2:
+            # Continue an existing array: drop the trailing "\n]".
+            self._fh = open(self.file_path, "rb+")
+            self._fh.seek(-2, os.SEEK_END)
+            self._fh.truncate()
+            self._first = False
+        else:
+            self._fh = open(self.file_path, "wb")
+            self._fh.write(b"[\n")
+
+    def write(self, record):
+        self._ensure_open()
+        if not self._first:
+            self._fh.write(b",\n")
+        self._first = False
+        # orjson serializes ~5-10x faster than stdlib json and emits UTF-8
+        # bytes directly; OPT_INDENT_2 keeps the logs human-readable.
+        self._fh.write(orjson.dumps(record, option=orjson.OPT_INDENT_2))
+        self._count += 1
+        if self._count % self.flush_every == 0:
+            self._fh.flush()
+
+    def close(self):
+        if self._fh is None:
+            return
+        self._fh.write(b"\n]")
+        self._fh.flush()
+        self._fh.close()
+        self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
 def append_json_record(file_path, record):
     # If file doesn't exist, start it
     if not os.path.exists(file_path):
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write("[\n")
-            f.write(json.dumps(record, ensure_ascii=False, indent=2))
-            f.write("\n]")
+        with open(file_path, "wb") as f:
+            f.write(b"[\n")
+            f.write(orjson.dumps(record, option=orjson.OPT_INDENT_2))
+            f.write(b"\n]")
     else:
         # Reopen, insert comma before the closing bracket
         with open(file_path, "rb+") as f:
             f.seek(-2, os.SEEK_END)  # Move before the last "\n]"
             f.truncate()  # Remove last two bytes
             f.write(b",\n")
-            f.write(json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8"))
+            f.write(orjson.dumps(record, option=orjson.OPT_INDENT_2))
             f.write(b"\n]")
 
 if __name__ == "__main__":